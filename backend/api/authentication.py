@@ -0,0 +1,160 @@
+import threading
+import time
+from collections import OrderedDict
+from hashlib import sha256
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+
+User = get_user_model()
+
+TOKEN_KEY = 'auth-token:{}'
+# Kept in the cache in place of an invalidated token, so a request that
+# read it from the database a moment before cannot cache it again.
+REVOKED = 'revoked'
+
+
+def get_attnames(model, names):
+    """The names in the order of the model fields, as from_db wants."""
+    return tuple(
+        field.attname for field in model._meta.concrete_fields
+        if field.attname in names
+    )
+
+
+TOKEN_FIELDS = get_attnames(Token, {'key', 'user_id', 'created'})
+# Enough for the serializers and permissions, the password hash and
+# the other fields are loaded from the database when accessed.
+USER_FIELDS = get_attnames(User, {
+    'id', 'username', 'email', 'first_name', 'last_name',
+    'is_active', 'is_staff', 'is_superuser',
+})
+
+
+class LocalCache:
+    """Thread-safe LRU of the most recently used entries, each kept
+    for ``ttl`` seconds.
+
+    Every delete starts a new generation. A value read elsewhere before
+    a delete is only stored with the generation it was read in, so it
+    cannot bring back a deleted entry.
+    """
+
+    def __init__(self, size, ttl):
+        self.size = size
+        self.ttl = ttl
+        self.generation = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, generation):
+        with self._lock:
+            if generation != self.generation:
+                return
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self.generation += 1
+            self._entries.pop(key, None)
+
+
+local_tokens = LocalCache(
+    settings.AUTH_TOKEN_CACHE_SIZE, settings.AUTH_TOKEN_LOCAL_TTL
+)
+
+
+def get_token_key(key):
+    return TOKEN_KEY.format(sha256(key.encode()).hexdigest())
+
+
+def invalidate_tokens(keys):
+    """Forget the cached tokens, in this process and in the shared
+    cache at once, in the LRUs of the other processes within
+    AUTH_TOKEN_LOCAL_TTL seconds.
+
+    With a cache local to each process the other processes keep them
+    for AUTH_TOKEN_CACHE_TTL, which then defaults to the local TTL.
+    """
+    keys = list(keys)
+    for key in keys:
+        local_tokens.delete(key)
+    # Long enough for the requests reading the tokens right now.
+    cache.set_many(
+        {get_token_key(key): REVOKED for key in keys},
+        timeout=settings.AUTH_TOKEN_LOCAL_TTL
+    )
+
+
+def invalidate_user_tokens(user):
+    invalidate_tokens(
+        Token.objects.filter(user=user).values_list('key', flat=True)
+    )
+
+
+def dump_token(token):
+    return (
+        tuple(getattr(token, field) for field in TOKEN_FIELDS),
+        tuple(getattr(token.user, field) for field in USER_FIELDS),
+    )
+
+
+def load_token(data):
+    """Token and user rebuilt from the cached fields, a new instance
+    per request.
+    """
+    token_values, user_values = data
+    token = Token.from_db(DEFAULT_DB_ALIAS, TOKEN_FIELDS, token_values)
+    token.user = User.from_db(DEFAULT_DB_ALIAS, USER_FIELDS, user_values)
+    return token
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Token authentication that looks tokens up in a per-process LRU,
+    then in the Django cache, and only then in the database.
+
+    Only valid tokens of active users are cached, without the password
+    hash. Logging out and saving the user revoke them. A token read
+    from the database is cached only if it was not revoked meanwhile.
+    """
+
+    def authenticate_credentials(self, key):
+        data = local_tokens.get(key)
+        if data is not None:
+            token = load_token(data)
+            return token.user, token
+        generation = local_tokens.generation
+        cache_key = get_token_key(key)
+        data = cache.get(cache_key)
+        if data == REVOKED:
+            return super().authenticate_credentials(key)
+        if data is None:
+            user, token = super().authenticate_credentials(key)
+            data = dump_token(token)
+            if not cache.add(
+                cache_key, data, timeout=settings.AUTH_TOKEN_CACHE_TTL
+            ):
+                return user, token
+        local_tokens.set(key, data, generation)
+        token = load_token(data)
+        return token.user, token
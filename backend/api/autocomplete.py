@@ -0,0 +1,80 @@
+import re
+import threading
+from bisect import bisect_left
+
+from .catalog import get_version
+from .models import Ingredient
+
+
+WORD_START = re.compile(r'\b\w')
+
+
+class IngredientIndex:
+    """Sorted, case-folded in-memory index of ingredient names, and of
+    the rest of every name from each of its later words on.
+
+    Every worker process holds its own read-only copy and rebuilds it
+    on the next search once the ingredients catalog version changes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._index = ([], [], [], [])
+        self._version = None
+
+    def _build(self, version):
+        rows = Ingredient.objects.values_list(
+            'id', 'name', 'measurement_unit__name'
+        )
+        items = sorted(
+            (name.casefold(), id, name, unit) for id, name, unit in rows
+        )
+        words = sorted(
+            (key[match.start():], position)
+            for position, (key, *_) in enumerate(items)
+            for match in WORD_START.finditer(key) if match.start()
+        )
+        self._index = (
+            [key for key, *_ in items],
+            [
+                {'id': id, 'name': name, 'measurement_unit': unit}
+                for _, id, name, unit in items
+            ],
+            [key for key, _ in words],
+            [position for _, position in words],
+        )
+        self._version = version
+
+    def _refresh(self):
+        version = get_version('ingredients')
+        if version == self._version:
+            return
+        with self._lock:
+            if version != self._version:
+                self._build(version)
+
+    def search(self, query, limit):
+        """Top ``limit`` ingredients whose name starts with ``query``,
+        followed by the ones with a later word starting with it.
+
+        Both are bisect lookups, a short query never scans the names.
+        """
+        self._refresh()
+        keys, entries, word_keys, word_positions = self._index
+        query = query.casefold()
+        found = []
+        position = bisect_left(keys, query)
+        while (position < len(keys) and len(found) < limit
+               and keys[position].startswith(query)):
+            found.append(position)
+            position += 1
+        position = bisect_left(word_keys, query)
+        while (position < len(word_keys) and len(found) < limit
+               and word_keys[position].startswith(query)):
+            if word_positions[position] not in found:
+                found.append(word_positions[position])
+            position += 1
+        return [entries[position] for position in found]
+
+
+ingredient_index = IngredientIndex()
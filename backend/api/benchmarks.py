@@ -0,0 +1,219 @@
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import HTTPError, URLError
+from urllib.request import Request, urlopen
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count
+from django.test import Client, RequestFactory
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from .authentication import (CachedTokenAuthentication, get_token_key,
+                             local_tokens)
+from .models import Ingredient, Recipe, Tag
+
+
+User = get_user_model()
+
+IMAGE = (
+    'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAA'
+    'ADUlEQVR42mNkYPhfDwAChwGA60e6kgAAAABJRU5ErkJggg=='
+)
+
+
+def percentile(values, percent):
+    """Nearest-rank percentile of a sorted list."""
+    index = max(0, round(percent / 100 * len(values)) - 1)
+    return values[min(index, len(values) - 1)]
+
+
+def measure(request, iterations):
+    """Run ``request`` repeatedly, return latency and query statistics."""
+    durations = []
+    queries = 0
+    status = None
+    for _ in range(iterations):
+        with CaptureQueriesContext(connection) as context:
+            start = time.perf_counter()
+            response = request()
+            if response.streaming:
+                b''.join(response.streaming_content)
+            durations.append((time.perf_counter() - start) * 1000)
+        queries = max(queries, len(context.captured_queries))
+        status = response.status_code
+    durations.sort()
+    return {
+        'status': status,
+        'queries': queries,
+        'mean_ms': round(sum(durations) / len(durations), 3),
+        'p50_ms': round(percentile(durations, 50), 3),
+        'p90_ms': round(percentile(durations, 90), 3),
+        'p99_ms': round(percentile(durations, 99), 3),
+    }
+
+
+def get_scenarios():
+    """Named requests against the key endpoints of the current dataset.
+
+    The benchmark user is the one with the most subscriptions, so that
+    subscriptions and the shopping cart have something to show.
+    """
+    user = User.objects.annotate(
+        subscribed=Count('subscriber')
+    ).order_by('-subscribed', 'id').first()
+    token, _ = Token.objects.get_or_create(user=user)
+    client = Client(
+        SERVER_NAME='localhost', HTTP_AUTHORIZATION=f'Token {token.key}'
+    )
+    recipe = Recipe.objects.order_by('-id').first()
+    own_recipe = Recipe.objects.filter(author=user).first() or recipe
+    tags = list(Tag.objects.values_list('slug', flat=True)[:2])
+    ingredients = list(Ingredient.objects.values_list('id', flat=True)[:10])
+    ingredient_name = Ingredient.objects.values_list(
+        'name', flat=True
+    ).first() or ''
+    payload = json.dumps({
+        'ingredients': [{'id': id, 'amount': 10} for id in ingredients],
+        'tags': list(Tag.objects.values_list('id', flat=True)[:2]),
+        'image': IMAGE,
+        'name': 'Benchmark recipe',
+        'text': 'Benchmark recipe text',
+        'cooking_time': 10,
+    })
+    tag_query = '&'.join(f'tags={slug}' for slug in tags)
+    read_model = override_settings(RECIPE_READ_MODEL=True)
+    return {
+        'recipe_list': lambda: client.get('/api/recipes/'),
+        'recipe_list_tags': lambda: client.get(
+            f'/api/recipes/?{tag_query}'
+        ),
+        'recipe_detail': lambda: client.get(f'/api/recipes/{recipe.id}/'),
+        'recipe_detail_read_model': read_model(
+            lambda: client.get(f'/api/recipes/{recipe.id}/')
+        ),
+        'recipe_list_personal': lambda: client.get(
+            '/api/recipes/?is_favorited=true&limit=20'
+        ),
+        'recipe_list_personal_read_model': read_model(
+            lambda: client.get('/api/recipes/?is_favorited=true&limit=20')
+        ),
+        'recipe_create': lambda: client.post(
+            '/api/recipes/', payload, content_type='application/json'
+        ),
+        'recipe_update': lambda: client.put(
+            f'/api/recipes/{own_recipe.id}/', payload,
+            content_type='application/json'
+        ),
+        'subscriptions': lambda: client.get('/api/users/subscriptions/'),
+        'download_shopping_cart': lambda: client.get(
+            '/api/recipes/download_shopping_cart/'
+        ),
+        'download_shopping_cart_text': lambda: client.get(
+            '/api/recipes/download_shopping_cart/?type=text'
+        ),
+        'download_shopping_cart_csv': lambda: client.get(
+            '/api/recipes/download_shopping_cart/?type=csv'
+        ),
+        'ingredient_search': lambda: client.get(
+            f'/api/ingredients/?name={ingredient_name[:3]}'
+        ),
+    }
+
+
+def measure_authentication(iterations):
+    """Per-request cost of the plain and the cached token
+    authentication, in microseconds and queries.
+
+    The cached one starts cold, its first request fills the caches.
+    """
+    user = User.objects.filter(is_active=True).order_by('id').first()
+    token, _ = Token.objects.get_or_create(user=user)
+    request = RequestFactory().get(
+        '/', HTTP_AUTHORIZATION=f'Token {token.key}'
+    )
+    # Cold caches, without revoking the token.
+    local_tokens.delete(token.key)
+    cache.delete(get_token_key(token.key))
+    results = {}
+    for name, authentication in (
+        ('token', TokenAuthentication()),
+        ('cached_token', CachedTokenAuthentication()),
+    ):
+        durations = []
+        queries = 0
+        for _ in range(iterations):
+            with CaptureQueriesContext(connection) as context:
+                start = time.perf_counter()
+                authentication.authenticate(request)
+                durations.append((time.perf_counter() - start) * 1000000)
+            queries += len(context.captured_queries)
+        durations.sort()
+        results[name] = {
+            'queries_per_request': round(queries / iterations, 3),
+            'mean_us': round(sum(durations) / len(durations), 1),
+            'p50_us': round(percentile(durations, 50), 1),
+            'p90_us': round(percentile(durations, 90), 1),
+        }
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Scenarios slower than the baseline by more than ``tolerance``
+    (a fraction) or issuing more queries than it did.
+    """
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        if result['queries'] > previous['queries']:
+            regressions.append(
+                f'{name}: {previous["queries"]} -> '
+                f'{result["queries"]} queries'
+            )
+        for key in ('p50_ms', 'p90_ms'):
+            if result[key] > previous[key] * (1 + tolerance):
+                regressions.append(
+                    f'{name}: {key} {previous[key]} -> {result[key]}'
+                )
+    return regressions
+
+
+def fetch(url, headers):
+    """Latency in ms of one request and whether it succeeded."""
+    start = time.perf_counter()
+    try:
+        with urlopen(Request(url, headers=headers)) as response:
+            response.read()
+            ok = True
+    except (HTTPError, URLError):
+        ok = False
+    return (time.perf_counter() - start) * 1000, ok
+
+
+def load_test(url, concurrency, total, headers=None):
+    """Send ``total`` requests to a running server from ``concurrency``
+    clients at once, return the throughput and latency statistics.
+    """
+    headers = headers or {}
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as clients:
+        results = list(clients.map(
+            lambda _: fetch(url, headers), range(total)
+        ))
+    elapsed = time.perf_counter() - start
+    durations = sorted(duration for duration, _ in results)
+    return {
+        'requests': total,
+        'errors': sum(not ok for _, ok in results),
+        'requests_per_second': round(total / elapsed, 1),
+        'mean_ms': round(sum(durations) / len(durations), 3),
+        'p50_ms': round(percentile(durations, 50), 3),
+        'p90_ms': round(percentile(durations, 90), 3),
+        'p99_ms': round(percentile(durations, 99), 3),
+    }
@@ -0,0 +1,101 @@
+import gzip
+import re
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags
+from rest_framework.renderers import JSONRenderer
+
+from .models import Ingredient, Recipe, Tag
+
+
+GENERATION_KEY = 'catalog-generation:{}'
+FINGERPRINT_KEY = 'catalog-fingerprint:{}'
+CONTENT_KEY = 'catalog:{}:{}'
+ACCEPTS_GZIP = re.compile(r'\bgzip\b')
+CATALOG_MODELS = {
+    'tags': Tag,
+    'ingredients': Ingredient,
+    'recipes': Recipe,
+}
+
+
+def get_fingerprint(catalog):
+    """Row count and last id of the catalog table, the same in every
+    process.
+    """
+    stats = CATALOG_MODELS[catalog].objects.aggregate(
+        count=Count('pk'), last=Max('pk')
+    )
+    return f'{stats["count"]}.{stats["last"]}'
+
+
+def get_version(catalog):
+    """Current version token of the catalog.
+
+    The token joins a random generation, replaced by ``bump_version``,
+    with the fingerprint of the table, read again every
+    CATALOG_VERSION_TIMEOUT seconds. Rows added or deleted by another
+    process therefore change the version even if its bump does not
+    reach this cache. A generation evicted from the cache is never
+    reused for different content.
+    """
+    generation_key = GENERATION_KEY.format(catalog)
+    fingerprint_key = FINGERPRINT_KEY.format(catalog)
+    values = cache.get_many([generation_key, fingerprint_key])
+    generation = values.get(generation_key)
+    if generation is None:
+        cache.add(generation_key, uuid4().hex, timeout=None)
+        generation = cache.get(generation_key)
+    fingerprint = values.get(fingerprint_key)
+    if fingerprint is None:
+        fingerprint = get_fingerprint(catalog)
+        cache.set(
+            fingerprint_key, fingerprint,
+            timeout=settings.CATALOG_VERSION_TIMEOUT
+        )
+    return f'{generation}-{fingerprint}'
+
+
+def bump_version(catalog):
+    cache.set(GENERATION_KEY.format(catalog), uuid4().hex, timeout=None)
+    cache.delete(FINGERPRINT_KEY.format(catalog))
+
+
+def get_content(catalog, version, get_data):
+    """Pre-rendered JSON and gzip bytes of the catalog version."""
+    key = CONTENT_KEY.format(catalog, version)
+    content = cache.get(key)
+    if content is None:
+        body = JSONRenderer().render(get_data())
+        content = (body, gzip.compress(body, mtime=0))
+        cache.set(key, content, timeout=settings.CATALOG_CACHE_TIMEOUT)
+    return content
+
+
+def catalog_response(request, catalog, get_data):
+    """Answer with the cached catalog bytes, or 304 if the client
+    already has them. ``get_data`` is called only on a cache miss.
+    """
+    version = get_version(catalog)
+    compress = bool(
+        ACCEPTS_GZIP.search(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+    )
+    etag = f'"{catalog}-{version}{"-gzip" if compress else ""}"'
+    if_none_match = parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))
+    if etag in if_none_match or '*' in if_none_match:
+        response = HttpResponseNotModified()
+    else:
+        body, compressed = get_content(catalog, version, get_data)
+        response = HttpResponse(
+            compressed if compress else body,
+            content_type='application/json'
+        )
+        if compress:
+            response['Content-Encoding'] = 'gzip'
+    response['ETag'] = etag
+    response['Vary'] = 'Accept-Encoding'
+    return response
@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.core.checks import Warning, register
+
+
+LOCAL_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register('caches', deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    """Catalog versions, token invalidation and replica stickiness
+    only reach the other processes through a shared cache.
+    """
+    if settings.CACHES['default']['BACKEND'] in LOCAL_BACKENDS:
+        return [Warning(
+            'The default cache is local to each process.',
+            hint='Set CACHE_LOCATION to a memcached server shared by the '
+                 'workers and the management commands.',
+            id='api.W001',
+        )]
+    return []
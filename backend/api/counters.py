@@ -0,0 +1,54 @@
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import AuthorStats, Favorite, Recipe, ShoppingCart, Subscription
+
+
+User = get_user_model()
+
+# Counted model: (counter model, foreign key to it, counter field).
+COUNTERS = {
+    Favorite: (Recipe, 'recipe', 'favorites_count'),
+    ShoppingCart: (Recipe, 'recipe', 'shopping_cart_count'),
+    Recipe: (AuthorStats, 'author', 'recipes_count'),
+    Subscription: (AuthorStats, 'author', 'followers_count'),
+}
+
+
+def change_counter(instance, delta):
+    model, relation, field = COUNTERS[type(instance)]
+    model.objects.filter(pk=getattr(instance, f'{relation}_id')).update(
+        **{field: F(field) + delta}
+    )
+
+
+def count_of(counted, relation):
+    return Coalesce(Subquery(
+        counted.objects.filter(
+            **{relation: OuterRef('pk')}
+        ).order_by().values(relation).annotate(
+            count=Count('pk')
+        ).values('count')
+    ), 0)
+
+
+def recalculate_counters():
+    """Recount every counter from scratch.
+
+    Returns the number of rows that had drifted, per counter.
+    """
+    AuthorStats.objects.bulk_create(
+        [AuthorStats(user_id=id) for id in User.objects.filter(
+            stats__isnull=True
+        ).values_list('id', flat=True)],
+        ignore_conflicts=True
+    )
+    drift = {}
+    for counted, (model, relation, field) in COUNTERS.items():
+        actual = count_of(counted, relation)
+        drift[f'{model.__name__}.{field}'] = model.objects.annotate(
+            actual=actual
+        ).exclude(**{field: F('actual')}).count()
+        model.objects.update(**{field: actual})
+    return drift
@@ -1,23 +1,81 @@
 import base64
+import binascii
+from tempfile import SpooledTemporaryFile
 
 import six
-from django.core.files.base import ContentFile
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 
+from .executors import run_blocking
+from .renditions import get_rendition_urls
+
+
+CHUNK_SIZE = 64 * 1024
+
 
 class Base64ImageField(serializers.ImageField):
-    """Custom ImageField to decode and save file from base64"""
+    """Custom ImageField to decode and save file from base64.
+
+    The base64 text is already in memory with the parsed request body,
+    the decoded bytes are written chunk by chunk into a temporary file
+    that moves to disk above FILE_UPLOAD_MAX_MEMORY_SIZE instead of
+    being held as a second copy. Line breaks and spaces of MIME wrapped
+    payloads are dropped. Payloads larger than RECIPE_IMAGE_MAX_SIZE
+    are rejected before decoding. Decoding and the Pillow check run on
+    the blocking pool.
+    """
 
     def to_internal_value(self, data):
+        return run_blocking(self.decode, data)
+
+    def decode(self, data):
         if isinstance(data, six.string_types) and data.startswith(
                 'data:image'):
-            format, imgstr = data.split(';base64,')
+            try:
+                format, imgstr = data.split(';base64,')
+            except ValueError:
+                raise ValidationError({'errors': 'Invalid image!'})
+            imgstr = ''.join(imgstr.split())
+            if len(imgstr) // 4 * 3 > settings.RECIPE_IMAGE_MAX_SIZE:
+                raise ValidationError({'errors': 'The image is too large!'})
             ext = format.split('/')[-1]
+            data = UploadedFile(
+                SpooledTemporaryFile(
+                    max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE
+                ),
+                name=f'image.{ext}', content_type=format[len('data:'):]
+            )
             try:
-                data = ContentFile(
-                    base64.b64decode(imgstr),
-                    name=f'image.{ext}')
-            except BaseException:
+                for start in range(0, len(imgstr), CHUNK_SIZE):
+                    data.write(base64.b64decode(
+                        imgstr[start:start + CHUNK_SIZE], validate=True
+                    ))
+            except (binascii.Error, ValueError):
+                data.close()
                 raise ValidationError({'errors': 'Invalid image!'})
+            data.size = data.tell()
+            data.seek(0)
         return super(Base64ImageField, self).to_internal_value(data)
+
+
+class ImageRenditionsField(serializers.ReadOnlyField):
+    """URLs of the recipe image renditions.
+
+    Until the renditions are generated every URL points to the original.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs['source'] = '*'
+        super().__init__(**kwargs)
+
+    def to_representation(self, recipe):
+        urls = get_rendition_urls(recipe)
+        request = self.context.get('request')
+        if urls is None or request is None:
+            return urls
+        return {
+            name: request.build_absolute_uri(url)
+            for name, url in urls.items()
+        }
@@ -1,6 +1,9 @@
 from django.db import transaction
 from rest_framework import mixins
 
+from .catalog import catalog_response
+from .instrumentation import timed_serialization
+
 
 class AtomicCreateModelMixin(mixins.CreateModelMixin):
     @transaction.atomic
@@ -24,3 +27,45 @@ class AtomicModelViewSetMixin(AtomicUpdateModelMixin,
                               AtomicCreateModelMixin,
                               AtomicDestroyModelMixin):
     pass
+
+
+class CachedCatalogListMixin(mixins.ListModelMixin):
+    """List the whole catalog from the versioned cache with ETags."""
+    catalog = None
+
+    def list(self, request, *args, **kwargs):
+        return catalog_response(request, self.catalog, self.serialize)
+
+    def serialize(self):
+        serializer = self.get_serializer(self.get_queryset(), many=True)
+        with timed_serialization():
+            return serializer.data
+
+
+class ThrottleCostMixin:
+    """Budget and cost of the actions for the cost throttles, actions
+    missing from ``throttle_costs`` are not throttled.
+
+    The cost is charged once every throttle let the request through, a
+    request one budget rejects uses up none of the others.
+    """
+    throttle_costs = {}
+
+    def get_throttle_cost(self, request):
+        return self.throttle_costs.get(self.action, (None, 0))
+
+    def check_throttles(self, request):
+        throttles = self.get_throttles()
+        durations = [
+            throttle.wait() for throttle in throttles
+            if not throttle.allow_request(request, self)
+        ]
+        if durations:
+            self.throttled(request, max(
+                (duration for duration in durations if duration is not None),
+                default=None
+            ))
+        for throttle in throttles:
+            charge = getattr(throttle, 'charge', None)
+            if charge is not None:
+                charge()
@@ -0,0 +1,19 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+
+blocking_executor = ThreadPoolExecutor(
+    max_workers=settings.BLOCKING_WORKERS, thread_name_prefix='blocking'
+)
+
+
+def run_blocking(func, *args, **kwargs):
+    """Run CPU bound work (PDF rendering, image decoding) on the bounded
+    pool and wait for the result.
+
+    However many requests ask for it, a process runs at most
+    BLOCKING_WORKERS of these jobs at once, the other request threads
+    keep serving cheap reads. The work must not touch the database.
+    """
+    return blocking_executor.submit(func, *args, **kwargs).result()
@@ -0,0 +1,178 @@
+import json
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import timedelta
+from hashlib import sha256
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils import timezone
+
+from .models import ShoppingListExport
+from .shopping_list import get_shopping_list
+from .utils import get_date, render_pdf_content
+
+
+logger = logging.getLogger(__name__)
+
+EXPORTS_DIR = 'shopping_lists'
+PURGE_INTERVAL = 60 * 60
+
+
+def get_digest(rows, date):
+    """Hash of everything that ends up in the PDF."""
+    content = json.dumps([date, rows], ensure_ascii=False, sort_keys=True)
+    return sha256(content.encode()).hexdigest()
+
+
+def get_export_name(digest):
+    return f'{EXPORTS_DIR}/{digest}.pdf'
+
+
+def get_cached_pdf(rows):
+    """Storage name of a PDF rendered before with the content of
+    ``rows``, or None.
+    """
+    name = get_export_name(get_digest(rows, get_date()))
+    return name if default_storage.exists(name) else None
+
+
+def enqueue_export(user, rows=None):
+    """Queue an export of the user's cart, or of its ``rows`` loaded
+    already. It is done at once when the same content was rendered
+    before.
+    """
+    if rows is None:
+        rows = get_shopping_list(user)
+    date = get_date()
+    digest = get_digest(rows, date)
+    done = default_storage.exists(get_export_name(digest))
+    return ShoppingListExport.objects.create(
+        user=user, digest=digest,
+        content=json.dumps({'date': date, 'rows': rows}),
+        status=ShoppingListExport.DONE if done else
+        ShoppingListExport.PENDING
+    )
+
+
+def claim_exports(limit):
+    """Mark up to ``limit`` pending exports as running and return them.
+
+    The status update is conditional, so concurrent workers never
+    claim the same export.
+    """
+    claimed = []
+    pending = ShoppingListExport.objects.filter(
+        status=ShoppingListExport.PENDING
+    ).order_by('created').values_list('id', flat=True)[:limit]
+    for id in pending:
+        if ShoppingListExport.objects.filter(
+            id=id, status=ShoppingListExport.PENDING
+        ).update(status=ShoppingListExport.RUNNING, updated=timezone.now()):
+            claimed.append(ShoppingListExport.objects.get(id=id))
+    return claimed
+
+
+def requeue_stale_exports():
+    """Put back exports left running by a worker that died."""
+    return ShoppingListExport.objects.filter(
+        status=ShoppingListExport.RUNNING,
+        updated__lt=timezone.now() - timedelta(
+            seconds=settings.SHOPPING_LIST_EXPORT_TIMEOUT
+        )
+    ).update(status=ShoppingListExport.PENDING, updated=timezone.now())
+
+
+def requeue_export(export):
+    """Render a done export again whose PDF is gone."""
+    ShoppingListExport.objects.filter(
+        id=export.id, status=ShoppingListExport.DONE
+    ).update(status=ShoppingListExport.PENDING, updated=timezone.now())
+    export.refresh_from_db()
+    return export
+
+
+def purge_exports():
+    """Delete exports and PDFs older than SHOPPING_LIST_EXPORT_TTL.
+
+    A new export can be done at once with an old PDF of the same
+    content, so PDFs still referenced by an export are kept.
+    """
+    expired = timezone.now() - timedelta(
+        seconds=settings.SHOPPING_LIST_EXPORT_TTL
+    )
+    ShoppingListExport.objects.filter(created__lt=expired).delete()
+    if not default_storage.exists(EXPORTS_DIR):
+        return
+    live = {
+        get_export_name(digest) for digest in
+        ShoppingListExport.objects.values_list('digest', flat=True)
+    }
+    _, files = default_storage.listdir(EXPORTS_DIR)
+    for file in files:
+        name = f'{EXPORTS_DIR}/{file}'
+        if (name not in live
+                and default_storage.get_modified_time(name) < expired):
+            default_storage.delete(name)
+
+
+def finish(exports, status, error=''):
+    ShoppingListExport.objects.filter(
+        id__in=[export.id for export in exports]
+    ).update(status=status, error=error, updated=timezone.now())
+
+
+def process_exports(pool, exports):
+    """Render the claimed exports on the process pool, once per digest."""
+    by_digest = {}
+    for export in exports:
+        by_digest.setdefault(export.digest, []).append(export)
+    futures = {}
+    for digest, same in by_digest.items():
+        if default_storage.exists(get_export_name(digest)):
+            finish(same, ShoppingListExport.DONE)
+            continue
+        content = json.loads(same[0].content)
+        futures[pool.submit(
+            render_pdf_content, content['rows'], content['date']
+        )] = digest
+    for future in as_completed(futures):
+        digest = futures[future]
+        try:
+            content = future.result()
+        except Exception as error:
+            logger.exception('Shopping list export %s failed', digest)
+            finish(by_digest[digest], ShoppingListExport.FAILED, repr(error))
+            continue
+        name = get_export_name(digest)
+        if not default_storage.exists(name):
+            default_storage.save(name, ContentFile(content))
+        finish(by_digest[digest], ShoppingListExport.DONE)
+
+
+def run_worker(processes, poll_interval, once=False):
+    """Process queued exports until stopped, or until the queue is
+    empty when ``once`` is set.
+    """
+    # Spawned processes start clean instead of inheriting the open
+    # database connections, rendering needs nothing from Django.
+    pool = ProcessPoolExecutor(
+        max_workers=processes, mp_context=multiprocessing.get_context('spawn')
+    )
+    purged = None
+    with pool:
+        while True:
+            requeue_stale_exports()
+            exports = claim_exports(processes)
+            if exports:
+                process_exports(pool, exports)
+                continue
+            if purged is None or time.monotonic() - purged > PURGE_INTERVAL:
+                purge_exports()
+                purged = time.monotonic()
+            if once:
+                return
+            time.sleep(poll_interval)
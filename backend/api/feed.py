@@ -0,0 +1,57 @@
+from django.db import connection
+
+from .models import FeedItem, Recipe, Subscription
+from .selections import execute
+
+
+def table(model):
+    return connection.ops.quote_name(model._meta.db_table)
+
+
+def insert_feed_items(select, params):
+    """Insert the (user_id, recipe_id) rows of ``select``, skipping the
+    ones in the feeds already.
+    """
+    ops = connection.ops
+    return execute(
+        f'{ops.insert_statement(ignore_conflicts=True)} '
+        f'{table(FeedItem)} (user_id, recipe_id) {select}'
+        f'{ops.ignore_conflicts_suffix_sql(ignore_conflicts=True)}',
+        params
+    )
+
+
+def fan_out(recipe):
+    """Add a new recipe to the feeds of the author's followers."""
+    return insert_feed_items(
+        f'SELECT user_id, %s FROM {table(Subscription)} '
+        'WHERE author_id = %s',
+        [recipe.id, recipe.author_id]
+    )
+
+
+def backfill_feed(user_id, author_id):
+    """Add the recipes of a newly followed author to the user's feed."""
+    return insert_feed_items(
+        f'SELECT %s, id FROM {table(Recipe)} WHERE author_id = %s',
+        [user_id, author_id]
+    )
+
+
+def trim_feed(user_id, author_id):
+    """Remove the recipes of an unfollowed author from the user's feed."""
+    return FeedItem.objects.filter(
+        user_id=user_id, recipe__author_id=author_id
+    ).delete()
+
+
+def rebuild_feeds():
+    """Recompute every feed, for subscriptions and recipes written
+    with bulk operations.
+    """
+    FeedItem.objects.all().delete()
+    return insert_feed_items(
+        f'SELECT s.user_id, r.id FROM {table(Subscription)} s '
+        f'JOIN {table(Recipe)} r ON r.author_id = s.author_id',
+        []
+    )
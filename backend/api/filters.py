@@ -1,27 +1,64 @@
+from django.db.models import Case, Exists, IntegerField, OuterRef, Value, When
 from django_filters import BooleanFilter, CharFilter, FilterSet
 
 from .models import Ingredient, Recipe
+from .search import search_recipes
 
 
 class RecipeFilter(FilterSet):
     tags = CharFilter(
         field_name='tags__slug', method='tags_filter'
     )
+    search = CharFilter(method='search_filter')
     is_favorited = BooleanFilter(field_name='is_favorited')
     is_in_shopping_cart = BooleanFilter(field_name='is_in_shopping_cart')
 
     class Meta:
         model = Recipe
-        fields = ['author', 'tags', 'is_favorited', 'is_in_shopping_cart']
+        fields = [
+            'author', 'tags', 'search', 'is_favorited', 'is_in_shopping_cart'
+        ]
 
     def tags_filter(self, queryset, name, value):
-        tags = self.request.query_params.getlist('tags')
-        return queryset.filter(tags__slug__in=tags).distinct()
+        """Recipes with any of the tags, or with all of them when
+        ``tags_match=all`` is passed.
+
+        Every condition is an EXISTS over the recipe-tag table, so the
+        recipe rows are not multiplied and need no DISTINCT.
+        """
+        tags = set(self.request.query_params.getlist('tags'))
+        recipe_tags = Recipe.tags.through.objects.filter(
+            recipe=OuterRef('pk')
+        )
+        if self.request.query_params.get('tags_match') == 'all':
+            for slug in tags:
+                queryset = queryset.filter(
+                    Exists(recipe_tags.filter(tag__slug=slug))
+                )
+            return queryset
+        return queryset.filter(
+            Exists(recipe_tags.filter(tag__slug__in=tags))
+        )
+
+    def search_filter(self, queryset, name, value):
+        return search_recipes(queryset, value)
 
 
 class IngredientFilter(FilterSet):
-    name = CharFilter(field_name='name', lookup_expr='istartswith')
+    name = CharFilter(field_name='name', method='name_filter')
 
     class Meta:
         model = Ingredient
         fields = ['name']
+
+    def name_filter(self, queryset, name, value):
+        """Names starting with the value go first, then the ones
+        containing it.
+        """
+        return queryset.filter(name__icontains=value).annotate(
+            prefix_match=Case(
+                When(name__istartswith=value, then=Value(0)),
+                default=Value(1),
+                output_field=IntegerField()
+            )
+        ).order_by('prefix_match', 'name')
@@ -0,0 +1,192 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+current_metrics = ContextVar('current_metrics', default=None)
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.db_queries = 0
+        self.db_time = 0
+        self.serializer_time = 0
+        self.serializer_depth = 0
+        self.view_start = None
+        self.view_time = 0
+        self.render_time = 0
+
+    def server_timing(self, total):
+        return ', '.join((
+            f'db;dur={self.db_time * 1000:.1f};'
+            f'desc="{self.db_queries} queries"',
+            f'view;dur={self.view_time * 1000:.1f}',
+            f'serializer;dur={self.serializer_time * 1000:.1f}',
+            f'render;dur={self.render_time * 1000:.1f}',
+            f'total;dur={total * 1000:.1f}',
+        ))
+
+
+class RouteHistogram:
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0
+        self.db_queries = 0
+        self.db_time = 0
+
+
+class MetricsRegistry:
+    """In-process latency histograms per route and method."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes = {}
+
+    def observe(self, route, method, duration, metrics):
+        with self._lock:
+            histogram = self._routes.get((route, method))
+            if histogram is None:
+                histogram = self._routes[(route, method)] = RouteHistogram()
+            histogram.buckets[bisect_left(BUCKETS, duration)] += 1
+            histogram.count += 1
+            histogram.sum += duration
+            histogram.db_queries += metrics.db_queries
+            histogram.db_time += metrics.db_time
+
+    def render(self):
+        """Prometheus text exposition format."""
+        lines = [
+            '# TYPE foodgram_request_duration_seconds histogram',
+        ]
+        totals = []
+        with self._lock:
+            routes = sorted(self._routes.items())
+            for (route, method), histogram in routes:
+                labels = f'route="{route}",method="{method}"'
+                cumulative = 0
+                for bound, count in zip(
+                    (*BUCKETS, '+Inf'), histogram.buckets
+                ):
+                    cumulative += count
+                    lines.append(
+                        'foodgram_request_duration_seconds_bucket'
+                        f'{{{labels},le="{bound}"}} {cumulative}'
+                    )
+                lines.append(
+                    f'foodgram_request_duration_seconds_sum{{{labels}}} '
+                    f'{histogram.sum:.6f}'
+                )
+                lines.append(
+                    f'foodgram_request_duration_seconds_count{{{labels}}} '
+                    f'{histogram.count}'
+                )
+                totals.append((labels, histogram))
+        lines.append('# TYPE foodgram_request_db_queries_total counter')
+        lines.extend(
+            f'foodgram_request_db_queries_total{{{labels}}} '
+            f'{histogram.db_queries}' for labels, histogram in totals
+        )
+        lines.append('# TYPE foodgram_request_db_seconds_total counter')
+        lines.extend(
+            f'foodgram_request_db_seconds_total{{{labels}}} '
+            f'{histogram.db_time:.6f}' for labels, histogram in totals
+        )
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+def record_query(execute, sql, params, many, context):
+    metrics = current_metrics.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.db_queries += 1
+        metrics.db_time += time.perf_counter() - start
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+@contextmanager
+def timed_serialization():
+    """Count the outermost block of a request as serializer time."""
+    metrics = current_metrics.get()
+    if metrics is None:
+        yield
+        return
+    metrics.serializer_depth += 1
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.serializer_depth -= 1
+        if not metrics.serializer_depth:
+            metrics.serializer_time += time.perf_counter() - start
+
+
+def install():
+    connection_created.connect(install_query_recorder)
+
+
+def sends_server_timing(request):
+    """Timings reveal the internals, only staff users get them unless
+    ``SERVER_TIMING`` is on.
+    """
+    if settings.SERVER_TIMING:
+        return True
+    user = getattr(request, 'user', None)
+    return user is not None and user.is_staff
+
+
+class PerformanceMiddleware:
+    """Measure SQL, view, serializer and render time of every request,
+    send them in the ``Server-Timing`` header to the clients allowed to
+    see them and add the request to the per-route histograms.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        end = time.perf_counter()
+        if metrics.view_start is not None and metrics.view_time:
+            metrics.render_time = end - metrics.view_start - metrics.view_time
+        elif metrics.view_start is not None:
+            metrics.view_time = end - metrics.view_start
+        total = end - metrics.start
+        if sends_server_timing(request):
+            response['Server-Timing'] = metrics.server_timing(total)
+        match = request.resolver_match
+        if match is not None:
+            registry.observe(match.view_name, request.method, total, metrics)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        current_metrics.get().view_start = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        metrics = current_metrics.get()
+        metrics.view_time = time.perf_counter() - metrics.view_start
+        return response
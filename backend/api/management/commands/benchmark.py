@@ -0,0 +1,68 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test.utils import override_settings
+
+from api.benchmarks import compare, get_scenarios, measure
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure latency and query count of the key endpoints. '
+        'Writes made by the scenarios are rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument(
+            '--scenario', action='append', dest='scenarios',
+            help='Run only the given scenario, may be repeated.'
+        )
+        parser.add_argument('--output', help='Save the results as JSON.')
+        parser.add_argument(
+            '--baseline',
+            help='JSON results of a previous run to compare with.'
+        )
+        parser.add_argument(
+            '--tolerance', type=float, default=0.2,
+            help='Allowed latency growth over the baseline, 0.2 is 20%%.'
+        )
+
+    def handle(self, *args, **options):
+        results = {}
+        # The scenarios repeat expensive requests far beyond the budgets.
+        with override_settings(THROTTLE_ENABLED=False), transaction.atomic():
+            scenarios = get_scenarios()
+            names = options['scenarios'] or list(scenarios)
+            unknown = set(names) - set(scenarios)
+            if unknown:
+                raise CommandError(
+                    f'Unknown scenarios: {", ".join(sorted(unknown))}'
+                )
+            for name in names:
+                results[name] = measure(
+                    scenarios[name], options['iterations']
+                )
+            transaction.set_rollback(True)
+        for name, result in results.items():
+            self.stdout.write(
+                f'{name:<32} {result["status"]} '
+                f'queries={result["queries"]:<3} '
+                f'p50={result["p50_ms"]:.1f}ms '
+                f'p90={result["p90_ms"]:.1f}ms '
+                f'p99={result["p99_ms"]:.1f}ms'
+            )
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(results, output, indent=2)
+        if options['baseline']:
+            with open(options['baseline']) as baseline:
+                regressions = compare(
+                    results, json.load(baseline), options['tolerance']
+                )
+            if regressions:
+                raise CommandError(
+                    'Performance regressions:\n' + '\n'.join(regressions)
+                )
+            self.stdout.write(self.style.SUCCESS('No regressions.'))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from api.benchmarks import measure_authentication
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare the per-request cost of the plain and the cached token '
+        'authentication.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        results = measure_authentication(options['iterations'])
+        for name, result in results.items():
+            self.stdout.write(
+                f'{name:<16} '
+                f'queries/request={result["queries_per_request"]:<6} '
+                f'mean={result["mean_us"]:.1f}us '
+                f'p50={result["p50_us"]:.1f}us '
+                f'p90={result["p90_us"]:.1f}us'
+            )
@@ -0,0 +1,85 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from django.test import RequestFactory
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from api.models import Recipe
+from api.read_model import get_recipes
+from api.serializers import RecipeListSerializer
+from api.views import RecipeViewSet
+
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare the recipes built by the read model with the output of '
+        'RecipeListSerializer, byte for byte.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=500)
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument(
+            '--user',
+            help='Username to compare the flags of, the most active '
+                 'subscriber by default. "-" compares as anonymous.'
+        )
+
+    def get_user(self, username):
+        if username == '-':
+            return AnonymousUser()
+        if username:
+            try:
+                return User.objects.get(username=username)
+            except User.DoesNotExist:
+                raise CommandError(f'User {username} does not exist.')
+        return User.objects.annotate(
+            subscribed=Count('subscriber')
+        ).order_by('-subscribed', 'id').first() or AnonymousUser()
+
+    def compare(self, recipe_ids, request):
+        """Ids of the recipes whose JSON differs."""
+        view = RecipeViewSet(request=request, format_kwarg=None)
+        recipes = view.get_queryset().filter(id__in=recipe_ids)
+        expected = {
+            recipe['id']: recipe for recipe in RecipeListSerializer(
+                recipes, many=True, context={'request': request}
+            ).data
+        }
+        actual = {
+            recipe['id']: recipe for recipe in get_recipes(recipe_ids, request)
+        }
+        renderer = JSONRenderer()
+        return [
+            id for id in recipe_ids
+            if renderer.render(expected.get(id))
+            != renderer.render(actual.get(id))
+        ]
+
+    def handle(self, *args, **options):
+        request = Request(
+            RequestFactory(SERVER_NAME='localhost').get('/api/recipes/')
+        )
+        request.user = self.get_user(options['user'])
+        recipe_ids = list(Recipe.objects.order_by('-id').values_list(
+            'id', flat=True
+        )[:options['limit']])
+        batch_size = options['batch_size']
+        different = []
+        for start in range(0, len(recipe_ids), batch_size):
+            different += self.compare(
+                recipe_ids[start:start + batch_size], request
+            )
+        if different:
+            raise CommandError(
+                f'{len(different)} of {len(recipe_ids)} recipes differ: '
+                f'{", ".join(map(str, different[:20]))}'
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(recipe_ids)} recipes are identical.'
+        ))
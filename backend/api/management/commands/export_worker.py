@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.exports import run_worker
+
+
+class Command(BaseCommand):
+    help = 'Render queued shopping list exports on a process pool.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes', type=int,
+            default=settings.SHOPPING_LIST_EXPORT_PROCESSES
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=1,
+            help='Seconds to wait when the queue is empty.'
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Exit once the queue is empty.'
+        )
+
+    def handle(self, *args, **options):
+        run_worker(
+            options['processes'], options['poll_interval'], options['once']
+        )
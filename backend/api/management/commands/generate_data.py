@@ -0,0 +1,141 @@
+import random
+from functools import partial
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.catalog import bump_version
+from api.counters import recalculate_counters
+from api.feed import rebuild_feeds
+from api.models import (COLOR_CHOICES, Favorite, Ingredient,
+                        IngredientInRecipe, Recipe, ShoppingCart,
+                        Subscription, Tag)
+from api.search import rebuild_search_index
+
+
+User = get_user_model()
+
+BATCH_SIZE = 500
+PASSWORD = 'benchmark-password'
+WORDS = (
+    'baked', 'spicy', 'grandma', 'quick', 'summer', 'creamy', 'crispy',
+    'soup', 'salad', 'pie', 'stew', 'pasta', 'pancakes', 'casserole',
+)
+
+
+def sample_pairs(left, right, count):
+    """Up to ``count`` distinct random (left, right) pairs."""
+    count = min(count, len(left) * len(right))
+    pairs = set()
+    while len(pairs) < count:
+        pairs.add((random.choice(left), random.choice(right)))
+    return pairs
+
+
+class Command(BaseCommand):
+    help = 'Generate a synthetic dataset for benchmarks.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--recipes', type=int, default=1000)
+        parser.add_argument('--favorites', type=int, default=5000)
+        parser.add_argument('--carts', type=int, default=1000)
+        parser.add_argument('--subscriptions', type=int, default=1000)
+        parser.add_argument(
+            '--seed', type=int, default=0,
+            help='Random seed, the same seed gives the same dataset.'
+        )
+
+    def create_tags(self):
+        for color, name in COLOR_CHOICES:
+            Tag.objects.get_or_create(
+                color=color, defaults={'name': name, 'slug': name.lower()}
+            )
+        return list(Tag.objects.values_list('id', flat=True))
+
+    def create_users(self, count):
+        first_id = (User.objects.order_by('-id').values_list(
+            'id', flat=True
+        ).first() or 0) + 1
+        password = make_password(PASSWORD)
+        usernames = [f'bench_{first_id + number}' for number in range(count)]
+        User.objects.bulk_create([
+            User(
+                username=username, email=f'{username}@example.com',
+                first_name='Bench', last_name=username, password=password,
+            ) for username in usernames
+        ], batch_size=BATCH_SIZE)
+        return list(User.objects.filter(
+            username__in=usernames
+        ).values_list('id', flat=True))
+
+    def create_recipes(self, count, users, tags, ingredients):
+        Recipe.objects.bulk_create([
+            Recipe(
+                author_id=random.choice(users),
+                name=' '.join(random.sample(WORDS, 3)).capitalize(),
+                text=' '.join(random.choices(WORDS, k=60)),
+                cooking_time=random.randint(5, 180),
+            ) for _ in range(count)
+        ], batch_size=BATCH_SIZE)
+        recipes = list(Recipe.objects.filter(
+            author_id__in=users
+        ).values_list('id', flat=True))
+        Recipe.tags.through.objects.bulk_create([
+            Recipe.tags.through(recipe_id=recipe, tag_id=tag)
+            for recipe in recipes
+            for tag in random.sample(tags, random.randint(1, len(tags)))
+        ], batch_size=BATCH_SIZE, ignore_conflicts=True)
+        IngredientInRecipe.objects.bulk_create([
+            IngredientInRecipe(
+                recipe_id=recipe, ingredient_id=ingredient,
+                amount=random.randint(1, 500)
+            )
+            for recipe in recipes
+            for ingredient in random.sample(
+                ingredients, random.randint(3, 15)
+            )
+        ], batch_size=BATCH_SIZE)
+        return recipes
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        if not Ingredient.objects.exists():
+            call_command('load_ingredients', stdout=self.stdout)
+        ingredients = list(Ingredient.objects.values_list('id', flat=True))
+        tags = self.create_tags()
+        users = self.create_users(options['users'])
+        recipes = self.create_recipes(
+            options['recipes'], users, tags, ingredients
+        )
+        Favorite.objects.bulk_create([
+            Favorite(user_id=user, recipe_id=recipe)
+            for user, recipe in sample_pairs(
+                users, recipes, options['favorites']
+            )
+        ], batch_size=BATCH_SIZE, ignore_conflicts=True)
+        ShoppingCart.objects.bulk_create([
+            ShoppingCart(user_id=user, recipe_id=recipe)
+            for user, recipe in sample_pairs(
+                users, recipes, options['carts']
+            )
+        ], batch_size=BATCH_SIZE)
+        Subscription.objects.bulk_create([
+            Subscription(user_id=user, author_id=author)
+            for user, author in sample_pairs(
+                users, users, options['subscriptions']
+            ) if user != author
+        ], batch_size=BATCH_SIZE, ignore_conflicts=True)
+        recalculate_counters()
+        rebuild_search_index()
+        rebuild_feeds()
+        for catalog in ('tags', 'ingredients', 'recipes'):
+            transaction.on_commit(partial(bump_version, catalog))
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {len(users)} users and {len(recipes)} recipes '
+            f'using {len(ingredients)} ingredients.'
+        ))
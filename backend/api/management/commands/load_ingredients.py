@@ -0,0 +1,136 @@
+import csv
+from functools import partial
+from itertools import islice
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from api.catalog import bump_version
+from api.models import Ingredient, Unit
+
+
+CSV_PATH = settings.BASE_DIR / 'data' / 'ingredients.csv'
+BATCH_SIZE = 500
+
+
+class RowsFile:
+    """Read-only file of CSV encoded rows for ``COPY ... FROM STDIN``."""
+
+    def __init__(self, rows):
+        self.rows = iter(rows)
+        self.buffer = ''
+        self.writer = csv.writer(self)
+
+    def write(self, text):
+        self.buffer += text
+
+    def read(self, size=-1):
+        for row in self.rows:
+            self.writer.writerow(row)
+            if 0 <= size <= len(self.buffer):
+                break
+        if size < 0:
+            size = len(self.buffer)
+        data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
+
+
+class Command(BaseCommand):
+    help = (
+        'Load ingredients from a CSV file of "name,unit" rows. '
+        'Ingredients that already exist are skipped.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default=CSV_PATH)
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def read_rows(self, source):
+        """Unique stripped (name, unit) pairs, invalid rows are skipped."""
+        name_length = Ingredient._meta.get_field('name').max_length
+        unit_length = Unit._meta.get_field('name').max_length
+        seen = set()
+        for number, row in enumerate(csv.reader(source), 1):
+            name, unit = (field.strip() for field in (row + ['', ''])[:2])
+            if not (0 < len(name) <= name_length
+                    and 0 < len(unit) <= unit_length):
+                self.stderr.write(f'Line {number} skipped: {row}')
+                continue
+            if (name, unit) not in seen:
+                seen.add((name, unit))
+                yield name, unit
+
+    def bulk_insert(self, rows, batch_size):
+        units = dict(Unit.objects.values_list('name', 'id'))
+        count = Ingredient.objects.count()
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                break
+            missing = {unit for _, unit in batch} - units.keys()
+            if missing:
+                Unit.objects.bulk_create(
+                    [Unit(name=name) for name in missing],
+                    ignore_conflicts=True
+                )
+                units.update(Unit.objects.filter(
+                    name__in=missing
+                ).values_list('name', 'id'))
+            Ingredient.objects.bulk_create([
+                Ingredient(name=name, measurement_unit_id=units[unit])
+                for name, unit in batch
+            ], ignore_conflicts=True)
+        return Ingredient.objects.count() - count
+
+    def copy(self, rows):
+        """Stream the rows into a temporary table with COPY and insert
+        the new units and ingredients from it with two statements.
+        """
+        quote = connection.ops.quote_name
+        units = quote(Unit._meta.db_table)
+        ingredients = quote(Ingredient._meta.db_table)
+        unit_column = quote(
+            Ingredient._meta.get_field('measurement_unit').column
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'CREATE TEMPORARY TABLE ingredient_import '
+                '(name text, unit text)'
+            )
+            cursor.copy_expert(
+                'COPY ingredient_import (name, unit) FROM STDIN '
+                'WITH (FORMAT csv)',
+                RowsFile(rows)
+            )
+            cursor.execute(
+                f'INSERT INTO {units} (name) '
+                'SELECT DISTINCT unit FROM ingredient_import '
+                'ON CONFLICT (name) DO NOTHING'
+            )
+            cursor.execute(
+                f'INSERT INTO {ingredients} (name, {unit_column}) '
+                f'SELECT ingredient_import.name, {units}.id '
+                f'FROM ingredient_import, {units} '
+                f'WHERE {units}.name = ingredient_import.unit '
+                f'ON CONFLICT (name, {unit_column}) DO NOTHING'
+            )
+            created = cursor.rowcount
+            cursor.execute('DROP TABLE ingredient_import')
+        return created
+
+    def handle(self, *args, **options):
+        try:
+            source = open(options['path'], encoding='utf-8', newline='')
+        except OSError as error:
+            raise CommandError(error)
+        with source, transaction.atomic():
+            rows = self.read_rows(source)
+            if connection.vendor == 'postgresql':
+                created = self.copy(rows)
+            else:
+                created = self.bulk_insert(rows, options['batch_size'])
+            transaction.on_commit(partial(bump_version, 'ingredients'))
+        self.stdout.write(self.style.SUCCESS(
+            f'Loaded {created} new ingredients.'
+        ))
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from api.benchmarks import load_test
+
+
+class Command(BaseCommand):
+    help = (
+        'Send concurrent requests to a running server, for example to '
+        'compare numbers of gunicorn workers and threads.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('urls', nargs='+')
+        parser.add_argument('--concurrency', type=int, default=32)
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--token', help='Authentication token.')
+
+    def handle(self, *args, **options):
+        headers = {}
+        if options['token']:
+            headers['Authorization'] = f'Token {options["token"]}'
+        for url in options['urls']:
+            result = load_test(
+                url, options['concurrency'], options['requests'], headers
+            )
+            self.stdout.write(
+                f'{url}\n'
+                f'  {result["requests_per_second"]} req/s, '
+                f'{result["errors"]} errors, '
+                f'p50={result["p50_ms"]:.1f}ms '
+                f'p90={result["p90_ms"]:.1f}ms '
+                f'p99={result["p99_ms"]:.1f}ms'
+            )
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.feed import rebuild_feeds
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompute the recipe feeds of every user, after subscriptions '
+        'or recipes were written with bulk operations.'
+    )
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        created = rebuild_feeds()
+        self.stdout.write(self.style.SUCCESS(
+            f'Wrote {created} feed items.'
+        ))
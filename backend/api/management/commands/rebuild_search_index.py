@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.search import rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompute the search fields of every recipe, after data was '
+        'written with bulk operations.'
+    )
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        rebuild_search_index()
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.counters import recalculate_counters
+
+
+class Command(BaseCommand):
+    help = 'Recount favorites, shopping carts, recipes and followers.'
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        for counter, drifted in recalculate_counters().items():
+            self.stdout.write(f'{counter}: {drifted} drifted row(s) fixed')
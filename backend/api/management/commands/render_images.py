@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from django.db.models import F
+
+from api.models import Recipe
+from api.renditions import generate_renditions
+
+
+class Command(BaseCommand):
+    help = (
+        'Render the image renditions of recipes saved before renditions '
+        'existed or whose rendering failed.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Render the renditions of every recipe image again.'
+        )
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.exclude(image='')
+        if not options['all']:
+            recipes = recipes.exclude(rendered_image=F('image'))
+        # Loaded at once, generate_renditions closes the connection.
+        images = list(recipes.order_by('id').values_list('id', 'image'))
+        rendered = sum(
+            generate_renditions(recipe_id, image_name)
+            for recipe_id, image_name in images
+        )
+        self.stdout.write(
+            f'{rendered} of {len(images)} recipe image(s) rendered'
+        )
@@ -0,0 +1,68 @@
+# Generated by Django 3.0.5 on 2026-10-18 12:15
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+import django.db.models.deletion
+
+
+def count_of(model, relation):
+    return Coalesce(Subquery(
+        model.objects.filter(
+            **{relation: OuterRef('pk')}
+        ).order_by().values(relation).annotate(
+            count=Count('pk')
+        ).values('count')
+    ), 0)
+
+
+def fill_counters(apps, schema_editor):
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    AuthorStats = apps.get_model('api', 'AuthorStats')
+    Recipe = apps.get_model('api', 'Recipe')
+    AuthorStats.objects.bulk_create(
+        [AuthorStats(user_id=id)
+         for id in User.objects.values_list('id', flat=True)]
+    )
+    AuthorStats.objects.update(
+        recipes_count=count_of(Recipe, 'author'),
+        followers_count=count_of(apps.get_model('api', 'Subscription'),
+                                 'author'),
+    )
+    Recipe.objects.update(
+        favorites_count=count_of(apps.get_model('api', 'Favorite'),
+                                 'recipe'),
+        shopping_cart_count=count_of(apps.get_model('api', 'ShoppingCart'),
+                                     'recipe'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('api', '0003_recipe_rendered_image'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('recipes_count', models.PositiveIntegerField(default=0, verbose_name='Recipes')),
+                ('followers_count', models.PositiveIntegerField(default=0, verbose_name='Followers')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Added to favorites'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='shopping_cart_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Added to shopping carts'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,79 @@
+# Generated by Django 3.0.5 on 2026-10-18 14:02
+
+from django.db import migrations
+from django.db.models import Count, Min
+
+
+def merge_recipe_rows(apps, keep_id, extra_ids):
+    """Point the recipe rows of the extra ingredients at the kept one,
+    a recipe with several of them keeps one row with their amounts
+    summed.
+    """
+    IngredientInRecipe = apps.get_model('api', 'IngredientInRecipe')
+    rows = {}
+    for row in IngredientInRecipe.objects.filter(
+        ingredient_id__in=[keep_id, *extra_ids]
+    ).order_by('id'):
+        kept = rows.setdefault(row.recipe_id, row)
+        if kept is row:
+            continue
+        if row.ingredient_id == keep_id:
+            # The row of the kept ingredient stays.
+            rows[row.recipe_id] = row
+            kept, row = row, kept
+        kept.amount += row.amount
+        row.delete()
+    for row in rows.values():
+        row.ingredient_id = keep_id
+    IngredientInRecipe.objects.bulk_update(
+        rows.values(), ['ingredient', 'amount']
+    )
+
+
+def check_recipe_rows(apps, ingredient_ids):
+    IngredientInRecipe = apps.get_model('api', 'IngredientInRecipe')
+    duplicates = IngredientInRecipe.objects.filter(
+        ingredient_id__in=ingredient_ids
+    ).values('recipe_id', 'ingredient_id').annotate(
+        count=Count('id')
+    ).filter(count__gt=1)
+    if duplicates.exists():
+        raise RuntimeError(
+            'Recipes still list merged ingredients more than once: '
+            f'{list(duplicates[:10])}'
+        )
+
+
+def merge_duplicate_ingredients(apps, schema_editor):
+    """Point recipes at the oldest of duplicate ingredients and delete
+    the rest.
+    """
+    Ingredient = apps.get_model('api', 'Ingredient')
+    duplicates = Ingredient.objects.values(
+        'name', 'measurement_unit'
+    ).annotate(count=Count('id'), keep=Min('id')).filter(count__gt=1)
+    kept = []
+    for group in duplicates:
+        extra = Ingredient.objects.filter(
+            name=group['name'], measurement_unit=group['measurement_unit']
+        ).exclude(id=group['keep'])
+        merge_recipe_rows(
+            apps, group['keep'],
+            list(extra.values_list('id', flat=True))
+        )
+        extra.delete()
+        kept.append(group['keep'])
+    check_recipe_rows(apps, kept)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            merge_duplicate_ingredients, migrations.RunPython.noop
+        ),
+    ]
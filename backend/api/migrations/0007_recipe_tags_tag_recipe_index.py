@@ -0,0 +1,24 @@
+# Generated by Django 3.0.5 on 2026-10-18 15:10
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """Index the recipe-tag table by tag first.
+
+    The unique (recipe_id, tag_id) index of the table serves the
+    EXISTS lookups per recipe, this one serves scans starting from the
+    tag. Both cover the lookups without touching the table itself.
+    """
+
+    dependencies = [
+        ('api', '0006_unique_ingredient'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            'CREATE INDEX api_recipe_tags_tag_recipe_idx '
+            'ON api_recipe_tags (tag_id, recipe_id);',
+            'DROP INDEX api_recipe_tags_tag_recipe_idx;',
+        ),
+    ]
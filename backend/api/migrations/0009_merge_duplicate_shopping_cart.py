@@ -0,0 +1,38 @@
+# Generated by Django 3.0.5 on 2026-10-18 16:20
+
+from django.db import migrations
+from django.db.models import Count, Min, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def merge_duplicate_shopping_cart(apps, schema_editor):
+    """Keep the oldest of duplicate cart rows and recount the carts."""
+    ShoppingCart = apps.get_model('api', 'ShoppingCart')
+    Recipe = apps.get_model('api', 'Recipe')
+    duplicates = ShoppingCart.objects.values(
+        'user', 'recipe'
+    ).annotate(count=Count('id'), keep=Min('id')).filter(count__gt=1)
+    for group in duplicates:
+        ShoppingCart.objects.filter(
+            user=group['user'], recipe=group['recipe']
+        ).exclude(id=group['keep']).delete()
+    Recipe.objects.update(shopping_cart_count=Coalesce(Subquery(
+        ShoppingCart.objects.filter(
+            recipe=OuterRef('pk')
+        ).order_by().values('recipe').annotate(
+            count=Count('pk')
+        ).values('count')
+    ), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_shoppinglistexport'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            merge_duplicate_shopping_cart, migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 3.0.5 on 2026-10-18 12:29
+
+from collections import defaultdict
+
+from django.db import migrations, models
+
+
+def fill_ingredient_names(apps, schema_editor):
+    Recipe = apps.get_model('api', 'Recipe')
+    IngredientInRecipe = apps.get_model('api', 'IngredientInRecipe')
+    names = defaultdict(list)
+    for recipe_id, name in IngredientInRecipe.objects.order_by(
+        'ingredient__name'
+    ).values_list('recipe_id', 'ingredient__name'):
+        names[recipe_id].append(name)
+    for recipe_id, recipe_names in names.items():
+        Recipe.objects.filter(id=recipe_id).update(
+            ingredient_names=', '.join(recipe_names)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_unique_shopping_cart'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='ingredient_names',
+            field=models.TextField(blank=True, default='', editable=False, verbose_name='Ingredient names for search'),
+        ),
+        migrations.RunPython(
+            fill_ingredient_names, migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,57 @@
+from django.db import migrations
+
+
+POSTGRESQL_CREATE = (
+    'ALTER TABLE api_recipe ADD COLUMN search_vector tsvector '
+    'GENERATED ALWAYS AS ('
+    "setweight(to_tsvector('english', coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(ingredient_names, '')), 'B') "
+    "|| setweight(to_tsvector('english', coalesce(text, '')), 'C')"
+    ') STORED',
+    'CREATE INDEX api_recipe_search_vector_idx '
+    'ON api_recipe USING gin (search_vector)',
+)
+POSTGRESQL_DROP = (
+    'DROP INDEX IF EXISTS api_recipe_search_vector_idx',
+    'ALTER TABLE api_recipe DROP COLUMN IF EXISTS search_vector',
+)
+SQLITE_CREATE = (
+    'CREATE VIRTUAL TABLE api_recipe_search '
+    'USING fts5(name, ingredient_names, text)',
+    'INSERT INTO api_recipe_search (rowid, name, ingredient_names, text) '
+    'SELECT id, name, ingredient_names, text FROM api_recipe',
+)
+SQLITE_DROP = (
+    'DROP TABLE IF EXISTS api_recipe_search',
+)
+
+
+def run_by_vendor(postgresql, sqlite):
+    def run(apps, schema_editor):
+        statements = {
+            'postgresql': postgresql, 'sqlite': sqlite
+        }.get(schema_editor.connection.vendor, ())
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+    """Full-text search index of recipes.
+
+    PostgreSQL gets a weighted tsvector column generated from the name,
+    ingredient names and text with a GIN index. SQLite gets an FTS5
+    table kept in sync by api.search. Other databases fall back to
+    LIKE over the same three columns.
+    """
+
+    dependencies = [
+        ('api', '0011_recipe_search'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run_by_vendor(POSTGRESQL_CREATE, SQLITE_CREATE),
+            run_by_vendor(POSTGRESQL_DROP, SQLITE_DROP),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 3.0.5 on 2026-10-18 12:36
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_feeds(apps, schema_editor):
+    quote = schema_editor.connection.ops.quote_name
+    feed, subscriptions, recipes = (
+        quote(apps.get_model('api', name)._meta.db_table)
+        for name in ('FeedItem', 'Subscription', 'Recipe')
+    )
+    schema_editor.execute(
+        f'INSERT INTO {feed} (user_id, recipe_id) '
+        f'SELECT s.user_id, r.id FROM {subscriptions} s '
+        f'JOIN {recipes} r ON r.author_id = s.author_id'
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('api', '0012_recipe_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedItem',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_items', to='api.Recipe')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_items', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='feeditem',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='unique_feed_item'),
+        ),
+        migrations.RunPython(fill_feeds, migrations.RunPython.noop),
+    ]
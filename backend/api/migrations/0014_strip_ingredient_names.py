@@ -0,0 +1,96 @@
+# Generated by Django 3.0.5 on 2026-10-18 18:40
+
+from django.db import migrations
+from django.db.models import Count
+
+
+def move_ingredient(apps, ingredient, name, unit_id):
+    """Give the ingredient the name and unit, or merge it into the
+    ingredient that has them already.
+
+    Returns the id of the ingredient merged into, if any.
+    """
+    Ingredient = apps.get_model('api', 'Ingredient')
+    IngredientInRecipe = apps.get_model('api', 'IngredientInRecipe')
+    keep = Ingredient.objects.filter(
+        name=name, measurement_unit_id=unit_id
+    ).exclude(id=ingredient.id).first()
+    if keep is None:
+        ingredient.name = name
+        ingredient.measurement_unit_id = unit_id
+        ingredient.save(update_fields=['name', 'measurement_unit'])
+        return None
+    # A recipe listing both keeps one row with the amounts summed.
+    rows = {}
+    for row in IngredientInRecipe.objects.filter(
+        ingredient_id__in=[keep.id, ingredient.id]
+    ).order_by('id'):
+        kept = rows.setdefault(row.recipe_id, row)
+        if kept is row:
+            continue
+        if row.ingredient_id == keep.id:
+            # The row of the kept ingredient stays.
+            rows[row.recipe_id] = row
+            kept, row = row, kept
+        kept.amount += row.amount
+        row.delete()
+    for row in rows.values():
+        row.ingredient_id = keep.id
+    IngredientInRecipe.objects.bulk_update(
+        rows.values(), ['ingredient', 'amount']
+    )
+    ingredient.delete()
+    return keep.id
+
+
+def strip_names(apps, schema_editor):
+    """Strip the unit and ingredient names loaded with the spaces of
+    the CSV file, such as " g", and merge them into the stripped ones
+    load_ingredients looks up.
+    """
+    Unit = apps.get_model('api', 'Unit')
+    Ingredient = apps.get_model('api', 'Ingredient')
+    IngredientInRecipe = apps.get_model('api', 'IngredientInRecipe')
+    merged = set()
+    for unit in Unit.objects.all():
+        name = unit.name.strip()
+        if name == unit.name:
+            continue
+        keep = Unit.objects.filter(name=name).first()
+        if keep is None:
+            unit.name = name
+            unit.save(update_fields=['name'])
+            continue
+        for ingredient in Ingredient.objects.filter(measurement_unit=unit):
+            merged.add(
+                move_ingredient(apps, ingredient, ingredient.name, keep.id)
+            )
+        unit.delete()
+    for ingredient in Ingredient.objects.all():
+        name = ingredient.name.strip()
+        if name != ingredient.name:
+            merged.add(move_ingredient(
+                apps, ingredient, name, ingredient.measurement_unit_id
+            ))
+    merged.discard(None)
+    duplicates = IngredientInRecipe.objects.filter(
+        ingredient_id__in=merged
+    ).values('recipe_id', 'ingredient_id').annotate(
+        count=Count('id')
+    ).filter(count__gt=1)
+    if duplicates.exists():
+        raise RuntimeError(
+            'Recipes still list merged ingredients more than once: '
+            f'{list(duplicates[:10])}'
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_feeditem'),
+    ]
+
+    operations = [
+        migrations.RunPython(strip_names, migrations.RunPython.noop),
+    ]
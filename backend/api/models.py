@@ -53,6 +53,9 @@ class Ingredient(models.Model):
 
     class Meta:
         ordering = ('name',)
+        constraints = [models.UniqueConstraint(
+            fields=['name', 'measurement_unit'], name='unique_ingredient'
+        )]
 
     def __str__(self) -> str:
         return self.name
@@ -74,13 +77,27 @@ class Recipe(models.Model):
         Tag, verbose_name='tags', related_name='tags'
     )
     text = models.TextField(verbose_name='Recipe description')
+    ingredient_names = models.TextField(
+        verbose_name='Ingredient names for search',
+        blank=True, default='', editable=False
+    )
     image = models.ImageField(
         verbose_name='Recipe image',
         upload_to='recipe_images/', blank=True, null=True
     )
+    rendered_image = models.CharField(
+        verbose_name='Image the renditions were generated from',
+        max_length=100, blank=True, editable=False
+    )
     cooking_time = models.SmallIntegerField(
         verbose_name='cooking_time (min)'
     )
+    favorites_count = models.PositiveIntegerField(
+        verbose_name='Added to favorites', default=0, editable=False
+    )
+    shopping_cart_count = models.PositiveIntegerField(
+        verbose_name='Added to shopping carts', default=0, editable=False
+    )
 
     def __str__(self) -> str:
         return self.name
@@ -107,6 +124,23 @@ class IngredientInRecipe(models.Model):
         return f'{self.recipe}: {self.ingredient} {self.amount}'
 
 
+class AuthorStats(models.Model):
+    """Denormalized counters of a user as a recipe author."""
+    user = models.OneToOneField(
+        User, on_delete=models.CASCADE, primary_key=True,
+        related_name='stats',
+    )
+    recipes_count = models.PositiveIntegerField(
+        verbose_name='Recipes', default=0
+    )
+    followers_count = models.PositiveIntegerField(
+        verbose_name='Followers', default=0
+    )
+
+    def __str__(self) -> str:
+        return f'{self.user} stats'
+
+
 class Subscription(models.Model):
     """User subscription to recipe author."""
     user = models.ForeignKey(
@@ -126,6 +160,28 @@ class Subscription(models.Model):
         return f'{self.user} is subscribed to author(s) {self.author}'
 
 
+class FeedItem(models.Model):
+    """Recipe of a followed author in the user's feed.
+
+    Written when a recipe is created or the user subscribes, so the
+    feed is read without joining subscriptions.
+    """
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='feed_items',
+    )
+    recipe = models.ForeignKey(
+        Recipe, on_delete=models.CASCADE, related_name='feed_items',
+    )
+
+    class Meta:
+        constraints = [models.UniqueConstraint(
+            fields=['user', 'recipe'], name='unique_feed_item'
+        )]
+
+    def __str__(self) -> str:
+        return f'Recipe {self.recipe} is in the {self.user}"s feed'
+
+
 class Favorite(models.Model):
     user = models.ForeignKey(
         User, on_delete=models.CASCADE, related_name='favorites',
@@ -152,6 +208,50 @@ class ShoppingCart(models.Model):
         Recipe, on_delete=models.CASCADE, related_name='recipe_cart'
     )
 
+    class Meta:
+        constraints = [models.UniqueConstraint(
+            fields=['user', 'recipe'], name='unique_shopping_cart'
+        )]
+
     def __str__(self) -> str:
         return (f'Recipe {self.recipe} is added '
                 f'to the {self.user}"s shopping cart')
+
+
+class ShoppingListExport(models.Model):
+    """Shopping cart export to PDF, rendered by the export worker."""
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE,
+        related_name='shopping_list_exports',
+    )
+    status = models.CharField(
+        verbose_name='Status', max_length=10,
+        choices=STATUS_CHOICES, default=PENDING
+    )
+    digest = models.CharField(
+        verbose_name='Hash of the exported content', max_length=64
+    )
+    content = models.TextField(verbose_name='Exported content as JSON')
+    error = models.TextField(verbose_name='Error', blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ('-created',)
+        indexes = [models.Index(
+            fields=['status', 'created'], name='export_status_created_idx'
+        )]
+
+    def __str__(self) -> str:
+        return f'Shopping list export of {self.user}: {self.status}'
@@ -1,5 +1,44 @@
 from rest_framework import pagination
 
 
+class CustomCursorPagination(pagination.CursorPagination):
+    """Keyset pagination on ``-id`` with opaque cursors."""
+    page_size_query_param = 'limit'
+    ordering = '-id'
+
+
+class FeedCursorPagination(CustomCursorPagination):
+    """Keyset pagination of feed items, newest recipes first."""
+    ordering = '-recipe_id'
+
+
 class CustomPageNumberPagination(pagination.PageNumberPagination):
+    """Page number pagination by default.
+
+    ``?pagination=cursor`` switches the request to keyset pagination,
+    which skips the COUNT query and the OFFSET scan on deep pages.
+    The ``next``/``previous`` links keep the mode.
+    """
     page_size_query_param = 'limit'
+    mode_query_param = 'pagination'
+    cursor_paginator = None
+
+    def use_cursor(self, request):
+        return (
+            request.query_params.get(self.mode_query_param) == 'cursor'
+            or CustomCursorPagination.cursor_query_param
+            in request.query_params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.use_cursor(request):
+            self.cursor_paginator = CustomCursorPagination()
+            return self.cursor_paginator.paginate_queryset(
+                queryset, request, view
+            )
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
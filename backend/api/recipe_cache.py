@@ -0,0 +1,69 @@
+import hashlib
+from copy import deepcopy
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.utils.http import urlencode
+
+from .catalog import get_version
+from .models import Favorite, ShoppingCart, Subscription
+
+
+PAGE_KEY = 'recipes:{}:{}'
+PERSONAL_PARAMS = ('is_favorited', 'is_in_shopping_cart')
+# Free text queries are rarely repeated, caching them only evicts pages.
+UNCACHED_PARAMS = (*PERSONAL_PARAMS, 'search')
+
+
+def get_page_key(request):
+    """Cache key of a recipe list page, or None if the page depends on
+    the current user beyond the per-recipe flags or is a search.
+    """
+    params = request.query_params
+    if any(params.get(name) for name in UNCACHED_PARAMS):
+        return None
+    normalized = urlencode(sorted(
+        (name, sorted(params.getlist(name))) for name in params
+    ), doseq=True)
+    digest = hashlib.md5(
+        f'{request.get_host()}?{normalized}'.encode()
+    ).hexdigest()
+    return PAGE_KEY.format(get_version('recipes'), digest)
+
+
+def personalize(recipes, user):
+    """Overlay the user's favorite, cart and subscription flags."""
+    favorited = in_shopping_cart = subscribed = set()
+    if user.is_authenticated:
+        recipe_ids = [recipe['id'] for recipe in recipes]
+        author_ids = {recipe['author']['id'] for recipe in recipes}
+        favorited = set(Favorite.objects.filter(
+            user=user, recipe__in=recipe_ids
+        ).values_list('recipe_id', flat=True))
+        in_shopping_cart = set(ShoppingCart.objects.filter(
+            user=user, recipe__in=recipe_ids
+        ).values_list('recipe_id', flat=True))
+        subscribed = set(Subscription.objects.filter(
+            user=user, author__in=author_ids
+        ).values_list('author_id', flat=True))
+    for recipe in recipes:
+        recipe['is_favorited'] = recipe['id'] in favorited
+        recipe['is_in_shopping_cart'] = recipe['id'] in in_shopping_cart
+        recipe['author']['is_subscribed'] = (
+            recipe['author']['id'] in subscribed
+        )
+    return recipes
+
+
+def get_page(key, user):
+    data = cache.get(key)
+    if data is not None:
+        personalize(data['results'], user)
+    return data
+
+
+def set_page(key, data):
+    shared = deepcopy(data)
+    personalize(shared['results'], AnonymousUser())
+    cache.set(key, shared, timeout=settings.RECIPE_LIST_CACHE_TIMEOUT)
@@ -0,0 +1,114 @@
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection
+from PIL import Image, ImageOps
+
+from .catalog import bump_version
+from .models import Recipe
+
+
+logger = logging.getLogger(__name__)
+
+RENDITIONS = {
+    'card': (480, 'JPEG', 'jpg'),
+    'detail': (1200, 'JPEG', 'jpg'),
+    'webp': (480, 'WEBP', 'webp'),
+}
+RENDITIONS_DIR = 'recipe_images/renditions'
+
+executor = ThreadPoolExecutor(
+    max_workers=settings.IMAGE_RENDITION_WORKERS,
+    thread_name_prefix='renditions'
+)
+pending = set()
+pending_lock = threading.Lock()
+
+
+def get_rendition_name(image_name, rendition):
+    *_, ext = RENDITIONS[rendition]
+    stem, _ = os.path.splitext(os.path.basename(image_name))
+    return f'{RENDITIONS_DIR}/{stem}_{rendition}.{ext}'
+
+
+def get_image_rendition_urls(image_name, rendered_image):
+    if not image_name:
+        return None
+    if rendered_image != image_name:
+        url = default_storage.url(image_name)
+        return {name: url for name in RENDITIONS}
+    return {
+        name: default_storage.url(get_rendition_name(image_name, name))
+        for name in RENDITIONS
+    }
+
+
+def get_rendition_urls(recipe):
+    return get_image_rendition_urls(recipe.image.name, recipe.rendered_image)
+
+
+def delete_renditions(image_name):
+    """Remove the renditions of an image no recipe shows any more."""
+    for rendition in RENDITIONS:
+        name = get_rendition_name(image_name, rendition)
+        if default_storage.exists(name):
+            default_storage.delete(name)
+
+
+def render(original, size, format):
+    image = original.copy()
+    image.thumbnail((size, size), Image.LANCZOS)
+    if format == 'JPEG' and image.mode != 'RGB':
+        image = image.convert('RGB')
+    output = BytesIO()
+    image.save(output, format=format, quality=85, optimize=True)
+    return ContentFile(output.getvalue())
+
+
+def generate_renditions(recipe_id, image_name):
+    """Render every rendition of the image and mark the recipe.
+
+    Returns whether the recipe still had the image and was marked.
+    """
+    try:
+        with default_storage.open(image_name) as source:
+            original = ImageOps.exif_transpose(Image.open(source))
+            original.load()
+        for rendition, (size, format, _) in RENDITIONS.items():
+            name = get_rendition_name(image_name, rendition)
+            if default_storage.exists(name):
+                default_storage.delete(name)
+            default_storage.save(name, render(original, size, format))
+        updated = Recipe.objects.filter(
+            pk=recipe_id, image=image_name
+        ).update(rendered_image=image_name)
+        if updated:
+            bump_version('recipes')
+        else:
+            # The image was replaced or the recipe deleted meanwhile.
+            delete_renditions(image_name)
+        return bool(updated)
+    except Exception:
+        logger.exception('Failed to render image %s', image_name)
+        return False
+    finally:
+        with pending_lock:
+            pending.discard(image_name)
+        connection.close()
+
+
+def schedule_renditions(recipe):
+    """Queue rendition of the recipe image on the worker pool,
+    unless the same image is already queued.
+    """
+    with pending_lock:
+        if recipe.image.name in pending:
+            return
+        pending.add(recipe.image.name)
+    executor.submit(generate_renditions, recipe.pk, recipe.image.name)
@@ -0,0 +1,119 @@
+import time
+from contextvars import ContextVar
+from hashlib import sha256
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from rest_framework.permissions import SAFE_METHODS
+
+
+REPLICA = 'replica'
+STICKY_KEY = 'db-sticky:{}'
+# Read from the primary even in safe requests, so a token created a
+# moment ago is accepted at once.
+PRIMARY_MODELS = {'authtoken.token'}
+
+current_routing = ContextVar('current_routing', default=None)
+
+
+class RequestRouting:
+    def __init__(self, use_replica):
+        self.use_replica = use_replica
+        self.wrote = False
+
+
+def mark_written():
+    """Send the remaining reads of the request and the next ones of the
+    client to the primary. The router calls it for ORM writes, raw SQL
+    writes have to call it themselves.
+    """
+    routing = current_routing.get()
+    if routing is not None:
+        routing.use_replica = False
+        routing.wrote = True
+
+
+class ReplicaRouter:
+    """Send the reads of safe requests to the replica and everything
+    else, including reads outside of requests, to the primary.
+
+    Once a request writes, its remaining reads go to the primary too.
+    """
+
+    def db_for_read(self, model, **hints):
+        routing = current_routing.get()
+        if (routing is None or not routing.use_replica
+                or model._meta.label_lower in PRIMARY_MODELS):
+            return DEFAULT_DB_ALIAS
+        return REPLICA
+
+    def db_for_write(self, model, **hints):
+        mark_written()
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+
+def check_connections():
+    """Close persistent connections that are too old or broken, so the
+    request opens new ones instead of failing on a dead socket.
+
+    Connections whose last query failed are checked by Django already,
+    the others are pinged at most every CONN_HEALTH_CHECK_INTERVAL
+    seconds instead of with a round trip per request.
+    """
+    now = time.monotonic()
+    for conn in connections.all():
+        if conn.connection is None or conn.in_atomic_block:
+            continue
+        conn.close_if_unusable_or_obsolete()
+        interval = conn.settings_dict.get('CONN_HEALTH_CHECK_INTERVAL')
+        if conn.connection is None or interval is None:
+            continue
+        checked = getattr(conn, 'health_checked', None)
+        if checked is None or checked[0] is not conn.connection:
+            # Opened since the last check, usable then.
+            conn.health_checked = (conn.connection, now)
+        elif now - checked[1] >= interval:
+            if conn.is_usable():
+                conn.health_checked = (conn.connection, now)
+            else:
+                conn.close()
+
+
+def get_sticky_key(request):
+    client = request.META.get(
+        'HTTP_AUTHORIZATION', request.META.get('REMOTE_ADDR', '')
+    )
+    return STICKY_KEY.format(sha256(client.encode()).hexdigest())
+
+
+class DatabaseRoutingMiddleware:
+    """Check the database connections and choose where the reads of
+    the request go.
+
+    A client that wrote reads from the primary for the next
+    REPLICA_STICKY_SECONDS, so it sees its own changes even while the
+    replica lags behind.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.replica = REPLICA in settings.DATABASES
+
+    def __call__(self, request):
+        check_connections()
+        if not self.replica:
+            return self.get_response(request)
+        safe = request.method in SAFE_METHODS
+        key = get_sticky_key(request)
+        routing = RequestRouting(safe and not cache.get(key))
+        token = current_routing.set(routing)
+        try:
+            return self.get_response(request)
+        finally:
+            current_routing.reset(token)
+            if routing.wrote or not safe:
+                cache.set(key, True, timeout=settings.REPLICA_STICKY_SECONDS)
@@ -0,0 +1,138 @@
+import re
+from collections import defaultdict
+
+from django.db import connection, transaction
+from django.db.models import BooleanField, FloatField, Q
+from django.db.models.expressions import RawSQL
+
+from .models import IngredientInRecipe, Recipe
+
+
+# Search index of SQLite, PostgreSQL uses the search_vector column.
+FTS_TABLE = 'api_recipe_search'
+# Relative weights of name, ingredient names and text in the ranking.
+FTS_WEIGHTS = (10.0, 5.0, 1.0)
+
+
+def sync_fts(recipe_ids):
+    if connection.vendor != 'sqlite':
+        return
+    placeholders = ', '.join(['%s'] * len(recipe_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})',
+            recipe_ids
+        )
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} '
+            '(rowid, name, ingredient_names, text) '
+            'SELECT id, name, ingredient_names, text FROM api_recipe '
+            f'WHERE id IN ({placeholders})',
+            recipe_ids
+        )
+
+
+def update_search_index(recipe_ids):
+    """Refresh the ingredient names of the recipes and their search
+    index entries.
+    """
+    recipe_ids = list(recipe_ids)
+    if not recipe_ids:
+        return
+    names = defaultdict(list)
+    for recipe_id, name in IngredientInRecipe.objects.filter(
+        recipe__in=recipe_ids
+    ).order_by('ingredient__name').values_list(
+        'recipe_id', 'ingredient__name'
+    ):
+        names[recipe_id].append(name)
+    for recipe_id in recipe_ids:
+        Recipe.objects.filter(id=recipe_id).update(
+            ingredient_names=', '.join(names[recipe_id])
+        )
+    sync_fts(recipe_ids)
+
+
+def update_search_index_on_commit(recipe_ids):
+    """Refresh the search index of the recipes once the transaction
+    commits, once per recipe however many of its rows were saved.
+
+    The ids wait in a set of the connection. Every call registers a
+    callback, the first one to run takes the whole set and the rest
+    find it empty. Ids left by a rolled back transaction are refreshed
+    with the next one, which is harmless.
+    """
+    pending = getattr(connection, 'search_index_pending', None)
+    if pending is None:
+        pending = connection.search_index_pending = set()
+    pending.update(recipe_ids)
+    transaction.on_commit(flush_search_index)
+
+
+def flush_search_index():
+    pending = getattr(connection, 'search_index_pending', None)
+    if pending:
+        connection.search_index_pending = set()
+        update_search_index(pending)
+
+
+def delete_from_search_index(recipe_id):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [recipe_id]
+        )
+
+
+def rebuild_search_index():
+    """Recompute the search fields of every recipe, for data written
+    with bulk operations.
+    """
+    recipe_ids = Recipe.objects.values_list('id', flat=True).iterator()
+    batch = []
+    for recipe_id in recipe_ids:
+        batch.append(recipe_id)
+        if len(batch) == 500:
+            update_search_index(batch)
+            batch = []
+    update_search_index(batch)
+
+
+def get_terms(value):
+    return re.findall(r'\w+', value.lower())
+
+
+def search_recipes(queryset, value):
+    """Recipes matching every word of ``value`` in their name, text or
+    ingredient names, best matches first.
+    """
+    if connection.vendor == 'postgresql':
+        query = "websearch_to_tsquery('english', %s)"
+        return queryset.filter(RawSQL(
+            f'api_recipe.search_vector @@ {query}', (value,),
+            output_field=BooleanField()
+        )).annotate(search_rank=RawSQL(
+            f'ts_rank(api_recipe.search_vector, {query})', (value,),
+            output_field=FloatField()
+        )).order_by('-search_rank', '-id')
+    terms = get_terms(value)
+    if not terms:
+        return queryset.none()
+    if connection.vendor == 'sqlite':
+        match = ' '.join(f'"{term}"*' for term in terms)
+        weights = ', '.join(str(weight) for weight in FTS_WEIGHTS)
+        return queryset.filter(id__in=RawSQL(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+            (match,)
+        )).annotate(search_rank=RawSQL(
+            f'(SELECT -bm25({FTS_TABLE}, {weights}) FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s AND rowid = api_recipe.id)',
+            (match,), output_field=FloatField()
+        )).order_by('-search_rank', '-id')
+    for term in terms:
+        queryset = queryset.filter(
+            Q(name__icontains=term) | Q(text__icontains=term)
+            | Q(ingredient_names__icontains=term)
+        )
+    return queryset
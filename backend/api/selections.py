@@ -0,0 +1,71 @@
+from django.db import connection, transaction
+from django.db.models import F
+
+from .counters import COUNTERS, count_of
+from .models import Recipe
+from .routers import mark_written
+
+
+def execute(sql, params):
+    """Run a raw write on the primary, the client reads its result
+    from there too.
+    """
+    mark_written()
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.rowcount
+
+
+def update_counters(model, recipe_ids, delta):
+    """Keep the recipe counters in step with raw inserts and deletes,
+    which send no signals.
+
+    A single recipe is moved by ``delta``, several are recounted since
+    it is unknown which of them changed.
+    """
+    counter_model, relation, field = COUNTERS[model]
+    recipes = counter_model.objects.filter(pk__in=recipe_ids)
+    if len(recipe_ids) == 1:
+        recipes.update(**{field: F(field) + delta})
+    else:
+        recipes.update(**{field: count_of(model, relation)})
+
+
+@transaction.atomic
+def add_recipes(model, user, recipe_ids):
+    """Add existing recipes to the user's favorites or shopping cart
+    with one INSERT that ignores the ones already there.
+
+    Returns the number of added recipes.
+    """
+    ops = connection.ops
+    placeholders = ', '.join(['%s'] * len(recipe_ids))
+    added = execute(
+        f'{ops.insert_statement(ignore_conflicts=True)} '
+        f'{ops.quote_name(model._meta.db_table)} (user_id, recipe_id) '
+        f'SELECT %s, id FROM {ops.quote_name(Recipe._meta.db_table)} '
+        f'WHERE id IN ({placeholders})'
+        f'{ops.ignore_conflicts_suffix_sql(ignore_conflicts=True)}',
+        [user.id, *recipe_ids]
+    )
+    if added:
+        update_counters(model, recipe_ids, added)
+    return added
+
+
+@transaction.atomic
+def remove_recipes(model, user, recipe_ids):
+    """Remove recipes from the user's favorites or shopping cart with
+    one DELETE.
+
+    Returns the number of removed recipes.
+    """
+    placeholders = ', '.join(['%s'] * len(recipe_ids))
+    removed = execute(
+        f'DELETE FROM {connection.ops.quote_name(model._meta.db_table)} '
+        f'WHERE user_id = %s AND recipe_id IN ({placeholders})',
+        [user.id, *recipe_ids]
+    )
+    if removed:
+        update_counters(model, recipe_ids, -removed)
+    return removed
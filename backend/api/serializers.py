@@ -1,11 +1,16 @@
+from django.conf import settings
+from django.db.models import (F, Prefetch, Window,
+                              prefetch_related_objects)
+from django.db.models.functions import RowNumber
+from django.urls import reverse
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 from rest_framework.fields import BooleanField
 from users.serializers import UserCustomSerializer
 
-from .custom_fields import Base64ImageField
+from .custom_fields import Base64ImageField, ImageRenditionsField
 from .models import (Favorite, Ingredient, IngredientInRecipe, Recipe,
-                     ShoppingCart, Subscription, Tag)
+                     ShoppingCart, ShoppingListExport, Subscription, Tag)
 
 
 class TagsSerializer(serializers.ModelSerializer):
@@ -27,10 +32,11 @@ class IngredientSerializer(serializers.ModelSerializer):
 
 
 class RecipeUserCustomSerializer(serializers.ModelSerializer):
+    image_renditions = ImageRenditionsField()
 
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'image_renditions', 'cooking_time')
 
 
 class IngredientInRecipeListSerializer(serializers.ModelSerializer):
@@ -56,11 +62,7 @@ class IngredientInRecipeListSerializer(serializers.ModelSerializer):
 
 
 class IngredientInRecipePostSerializer(serializers.ModelSerializer):
-    id = serializers.SlugRelatedField(
-        source='ingredient',
-        slug_field='id',
-        queryset=Ingredient.objects.all()
-    )
+    id = serializers.IntegerField(source='ingredient')
 
     class Meta:
         model = IngredientInRecipe
@@ -76,12 +78,14 @@ class RecipeListSerializer(serializers.ModelSerializer):
     is_favorited = BooleanField(read_only=True)
     is_in_shopping_cart = BooleanField(read_only=True)
     image = Base64ImageField()
+    image_renditions = ImageRenditionsField()
 
     class Meta:
         model = Recipe
         fields = ('id', 'tags', 'author', 'ingredients',
                   'is_favorited', 'is_in_shopping_cart',
-                  'name', 'image', 'text', 'cooking_time')
+                  'name', 'image', 'image_renditions', 'text',
+                  'cooking_time')
 
 
 class RecipePostSerializer(serializers.ModelSerializer):
@@ -106,15 +110,22 @@ class RecipePostSerializer(serializers.ModelSerializer):
     def validate_ingredients(self, data):
         if len(data) == 0:
             raise ValidationError('The ingredient field must not be empty')
+        ingredients = Ingredient.objects.in_bulk(
+            [item['ingredient'] for item in data]
+        )
         ingredients_unique = set()
         for item in data:
-            if item['ingredient'].id in ingredients_unique:
+            ingredient = ingredients.get(item['ingredient'])
+            if ingredient is None:
                 raise ValidationError(
-                    f'{item["ingredient"]} has already been added'
+                    f'Ingredient {item["ingredient"]} does not exist'
                 )
+            elif ingredient.id in ingredients_unique:
+                raise ValidationError(f'{ingredient} has already been added')
             elif int(item['amount']) <= 0:
                 raise ValidationError('The amount must be greater than zero')
-            ingredients_unique.add(item['ingredient'].id)
+            ingredients_unique.add(ingredient.id)
+            item['ingredient'] = ingredient
         return data
 
     def validate_cooking_time(self, value):
@@ -125,13 +136,36 @@ class RecipePostSerializer(serializers.ModelSerializer):
         return value
 
     def create_ingredients_in_recipe(self, recipe, ingredients):
+        IngredientInRecipe.objects.bulk_create([
+            IngredientInRecipe(
+                recipe=recipe,
+                ingredient=item['ingredient'],
+                amount=item['amount'],
+            ) for item in ingredients
+        ])
+
+    def update_ingredients_in_recipe(self, recipe, ingredients):
+        """Write only the ingredient rows that differ from the existing ones.
+        """
+        existing = {
+            item.ingredient_id: item
+            for item in recipe.ingredientsinrecipe.all()
+        }
+        to_create, to_update = [], []
         for item in ingredients:
-            id = item.get('ingredient').id
-            ingredient = Ingredient.objects.get(id=id)
-            amount = item.get('amount')
-            IngredientInRecipe.objects.create(
-                recipe=recipe, ingredient=ingredient, amount=amount,
-            )
+            current = existing.pop(item['ingredient'].id, None)
+            if current is None:
+                to_create.append(item)
+            elif current.amount != item['amount']:
+                current.amount = item['amount']
+                to_update.append(current)
+        if existing:
+            IngredientInRecipe.objects.filter(
+                id__in=[item.id for item in existing.values()]
+            ).delete()
+        if to_update:
+            IngredientInRecipe.objects.bulk_update(to_update, ['amount'])
+        self.create_ingredients_in_recipe(recipe, to_create)
 
     def create(self, validated_data):
         ingredients = validated_data.pop('ingredientsinrecipe')
@@ -142,25 +176,65 @@ class RecipePostSerializer(serializers.ModelSerializer):
         return recipe
 
     def update(self, instance, validated_data):
-        ingredients = validated_data.pop('ingredientsinrecipe')
-        tags = validated_data.pop('tags')
+        ingredients = validated_data.pop('ingredientsinrecipe', None)
+        tags = validated_data.pop('tags', None)
         instance.name = validated_data.get('name', instance.name)
         instance.text = validated_data.get('text', instance.text)
         instance.cooking_time = validated_data.get(
             'cooking_time', instance.cooking_time
         )
         instance.image = validated_data.get('image', instance.image)
-        IngredientInRecipe.objects.filter(recipe=instance).delete()
-        instance.tags.clear()
-        instance.tags.add(*tags)
-        self.create_ingredients_in_recipe(instance, ingredients)
+        instance.save()
+        if tags is not None:
+            instance.tags.set(tags)
+        if ingredients is not None:
+            self.update_ingredients_in_recipe(instance, ingredients)
         return instance
 
     def to_representation(self, instance):
+        prefetch_related_objects(
+            [instance], 'tags', Prefetch(
+                'ingredientsinrecipe',
+                queryset=IngredientInRecipe.objects.select_related(
+                    'ingredient__measurement_unit'
+                ).order_by('id')
+            )
+        )
         serializer = RecipeListSerializer(instance)
         return serializer.data
 
 
+def get_recipes_preview(authors, limit):
+    """First ``limit`` recipes of every author, fetched in one query."""
+    recipes = Recipe.objects.filter(author__in=authors).annotate(
+        row_number=Window(
+            expression=RowNumber(),
+            partition_by=[F('author_id')],
+            order_by=F('id').asc()
+        )
+    )
+    sql, params = recipes.query.sql_with_params()
+    previews = {author.id: [] for author in authors}
+    for recipe in Recipe.objects.raw(
+        f'SELECT * FROM ({sql}) AS preview '
+        'WHERE preview.row_number <= %s ORDER BY preview.id',
+        (*params, limit)
+    ):
+        previews[recipe.author_id].append(recipe)
+    return previews
+
+
+class SubscribeListSerializer(serializers.ListSerializer):
+    """Load recipe previews for the whole page of authors at once."""
+
+    def to_representation(self, data):
+        authors = list(data)
+        LIMIT = int(self.context['request'].
+                    query_params.get('recipes_limit', 6))
+        self.context['recipes'] = get_recipes_preview(authors, LIMIT)
+        return super().to_representation(authors)
+
+
 class SubscribeSerializer(serializers.ModelSerializer):
     user = serializers.PrimaryKeyRelatedField(read_only=True)
     author = serializers.SlugRelatedField(
@@ -171,18 +245,24 @@ class SubscribeSerializer(serializers.ModelSerializer):
     class Meta:
         model = Subscription
         fields = ('user', 'author')
+        list_serializer_class = SubscribeListSerializer
 
     def to_representation(self, instance):
         serializer_author = UserCustomSerializer(
-            instance, context={'request': self.context['request']}
+            instance, context=self.context
         )
-        LIMIT = int(self.context['request'].
-                    query_params.get('recipes_limit', 6))
-        recipes_queryset = Recipe.objects.filter(author=instance)
+        recipes = self.context.get('recipes')
+        if recipes is None:
+            LIMIT = int(self.context['request'].
+                        query_params.get('recipes_limit', 6))
+            recipes = get_recipes_preview([instance], LIMIT)
         recipes_serializer = RecipeUserCustomSerializer(
-            recipes_queryset[:LIMIT], many=True
+            recipes[instance.id], many=True
         ).data
-        recipes_count = recipes_queryset.count()
+        recipes_count = getattr(instance, 'recipes_count', None)
+        if recipes_count is None:
+            stats = getattr(instance, 'stats', None)
+            recipes_count = stats.recipes_count if stats else 0
         result = serializer_author.data
         result['recipes'] = recipes_serializer
         result['recipes_count'] = recipes_count
@@ -219,3 +299,28 @@ class ShoppingCartSerializer(serializers.ModelSerializer):
     def to_representation(self, instance):
         serializer = RecipeUserCustomSerializer(instance)
         return serializer.data
+
+
+class RecipeIdsSerializer(serializers.Serializer):
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        min_length=1, max_length=settings.BULK_RECIPES_LIMIT
+    )
+
+    def validate_recipes(self, value):
+        return sorted(set(value))
+
+
+class ShoppingListExportSerializer(serializers.ModelSerializer):
+    download = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ShoppingListExport
+        fields = ('id', 'status', 'created', 'download')
+
+    def get_download(self, obj):
+        if obj.status != ShoppingListExport.DONE:
+            return None
+        return self.context['request'].build_absolute_uri(reverse(
+            'api:shopping_list_exports-download', args=(obj.id,)
+        ))
@@ -0,0 +1,117 @@
+import csv
+from decimal import Decimal
+from itertools import groupby
+
+from django.db.models import F, Sum
+from django.http import StreamingHttpResponse
+
+from .models import IngredientInRecipe
+from .utils import FILENAME
+
+
+# Unit names, lower case, mapped to the unit they are summed in and
+# its multiplier. Spellings of the same unit in ingredients.csv are
+# merged too.
+UNIT_CONVERSIONS = {
+    'g': ('g', 1),
+    'kg': ('g', 1000),
+    'ml': ('ml', 1),
+    'l': ('ml', 1000),
+    'art. l.': ('Art. l.', 1),
+    'st. l.': ('Art. l.', 1),
+    'h. l.': ('h. l.', 1),
+    'tsp l.': ('h. l.', 1),
+    'pcs.': ('pcs.', 1),
+    'piece': ('pcs.', 1),
+    'pinch': ('pinch', 1),
+    'a pinch': ('pinch', 1),
+    'handful': ('handful', 1),
+    'a handful': ('handful', 1),
+}
+# Larger units a total is shown in once it reaches one of them.
+DISPLAY_UNITS = {
+    'g': ('kg', 1000),
+    'ml': ('l', 1000),
+}
+CONTENT_TYPES = {
+    'text': ('text/plain; charset=utf-8', 'txt'),
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+}
+
+
+def get_cart_amounts(user):
+    """Ingredients of the user's cart summed per name and unit."""
+    return list(IngredientInRecipe.objects.filter(
+        recipe__recipe_cart__user=user
+    ).values(
+        name=F('ingredient__name'),
+        measurement_unit=F('ingredient__measurement_unit__name')
+    ).annotate(
+        amount=Sum('amount')
+    ).order_by('name', 'measurement_unit'))
+
+
+def get_display_amount(unit, amount):
+    larger = DISPLAY_UNITS.get(unit)
+    if larger is not None and amount >= larger[1]:
+        unit, amount = larger[0], Decimal(amount) / larger[1]
+        amount = int(amount) if amount == int(amount) else float(amount)
+    return unit, amount
+
+
+def merge_units(rows):
+    """Combine the rows of one ingredient in convertible units, such as
+    grams and kilograms, into one line. ``rows`` are sorted by name.
+    """
+    for name, same_name in groupby(rows, key=lambda row: row['name']):
+        totals = {}
+        for row in same_name:
+            unit = row['measurement_unit'].strip()
+            unit, factor = UNIT_CONVERSIONS.get(unit.lower(), (unit, 1))
+            totals[unit] = totals.get(unit, 0) + row['amount'] * factor
+        for unit in sorted(totals):
+            unit, amount = get_display_amount(unit, totals[unit])
+            yield {'name': name, 'measurement_unit': unit, 'amount': amount}
+
+
+def get_shopping_list(user):
+    return list(merge_units(get_cart_amounts(user)))
+
+
+class Echo:
+    """File-like object that hands back what is written to it."""
+
+    def write(self, value):
+        return value
+
+
+def text_lines(items):
+    for item in items:
+        yield (
+            f"{item['name']} - {item['amount']} "
+            f"{item['measurement_unit']}\n"
+        )
+
+
+def csv_lines(items):
+    writer = csv.writer(Echo())
+    yield writer.writerow(('name', 'amount', 'measurement_unit'))
+    for item in items:
+        yield writer.writerow(
+            (item['name'], item['amount'], item['measurement_unit'])
+        )
+
+
+def shopping_list_response(items, file_type):
+    """Stream the shopping list as plain text or CSV.
+
+    ``items`` are loaded before streaming starts, so the response holds
+    no queryset that would query while it is sent.
+    """
+    content_type, extension = CONTENT_TYPES[file_type]
+    lines = text_lines(items) if file_type == 'text' else csv_lines(items)
+    response = StreamingHttpResponse(lines, content_type=content_type)
+    response['Content-Disposition'] = (
+        f'attachment; filename="{FILENAME}.{extension}"'
+    )
+    return response
@@ -0,0 +1,165 @@
+from functools import partial
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .authentication import invalidate_tokens, invalidate_user_tokens
+from .catalog import bump_version
+from .counters import change_counter
+from .feed import backfill_feed, fan_out, trim_feed
+from .models import (AuthorStats, Favorite, Ingredient, IngredientInRecipe,
+                     Recipe, ShoppingCart, Subscription, Tag, Unit)
+from .renditions import delete_renditions, schedule_renditions
+from .search import (delete_from_search_index,
+                     update_search_index_on_commit)
+
+
+User = get_user_model()
+
+AUTHOR_FIELDS = {'email', 'username', 'first_name', 'last_name'}
+
+
+def bump_on_commit(*catalogs):
+    for catalog in catalogs:
+        transaction.on_commit(partial(bump_version, catalog))
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+@receiver(post_save, sender=Unit)
+@receiver(post_delete, sender=Unit)
+def ingredient_catalog_changed(sender, **kwargs):
+    bump_on_commit('ingredients', 'recipes')
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def tag_catalog_changed(sender, **kwargs):
+    bump_on_commit('tags', 'recipes')
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_save, sender=IngredientInRecipe)
+@receiver(post_delete, sender=IngredientInRecipe)
+def recipe_changed(sender, **kwargs):
+    bump_on_commit('recipes')
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_search_changed(sender, instance, **kwargs):
+    """Also covers the ingredients the API writes with bulk queries in
+    the same transaction, the index is refreshed on commit.
+    """
+    update_search_index_on_commit([instance.id])
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_search_deleted(sender, instance, **kwargs):
+    delete_from_search_index(instance.id)
+
+
+@receiver(post_save, sender=IngredientInRecipe)
+def recipe_ingredient_saved(sender, instance, **kwargs):
+    update_search_index_on_commit([instance.recipe_id])
+
+
+@receiver(post_save, sender=Ingredient)
+def ingredient_renamed(sender, instance, created, **kwargs):
+    if not created:
+        update_search_index_on_commit(IngredientInRecipe.objects.filter(
+            ingredient=instance
+        ).values_list('recipe_id', flat=True).distinct())
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_image_changed(sender, instance, **kwargs):
+    replaced = instance.rendered_image
+    if replaced and replaced != instance.image.name:
+        transaction.on_commit(partial(delete_renditions, replaced))
+    if instance.image and instance.image.name != instance.rendered_image:
+        transaction.on_commit(partial(schedule_renditions, instance))
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_image_deleted(sender, instance, **kwargs):
+    if instance.rendered_image:
+        transaction.on_commit(
+            partial(delete_renditions, instance.rendered_image)
+        )
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_tags_changed(sender, action, **kwargs):
+    if action.startswith('post_'):
+        bump_on_commit('recipes')
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def author_changed(sender, update_fields=None, **kwargs):
+    """Recipe pages embed author fields, saves limited to other fields
+    such as last_login are skipped.
+    """
+    if update_fields is None or AUTHOR_FIELDS & set(update_fields):
+        bump_on_commit('recipes')
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    transaction.on_commit(partial(invalidate_tokens, [instance.key]))
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, update_fields=None, **kwargs):
+    """Drop the cached tokens of the user once committed, so a changed
+    password, deactivation or profile edit applies at once. Logins only
+    write last_login and keep them.
+    """
+    if created:
+        return
+    if update_fields is None or set(update_fields) - {'last_login'}:
+        transaction.on_commit(partial(invalidate_user_tokens, instance))
+
+
+@receiver(post_save, sender=User)
+def create_author_stats(sender, instance, created, **kwargs):
+    if created:
+        AuthorStats.objects.create(user=instance)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_published(sender, instance, created, **kwargs):
+    if created:
+        fan_out(instance)
+
+
+@receiver(post_save, sender=Subscription)
+def subscription_created(sender, instance, created, **kwargs):
+    if created:
+        backfill_feed(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Subscription)
+def subscription_deleted(sender, instance, **kwargs):
+    trim_feed(instance.user_id, instance.author_id)
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=Subscription)
+def counted_object_created(sender, instance, created, **kwargs):
+    if created:
+        change_counter(instance, 1)
+
+
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingCart)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Subscription)
+def counted_object_deleted(sender, instance, **kwargs):
+    change_counter(instance, -1)
@@ -0,0 +1,1001 @@
+import gzip
+import os
+import shutil
+import tempfile
+import time
+from contextlib import contextmanager
+from io import BytesIO
+from unittest import mock
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, connections
+from django.test import RequestFactory, TestCase, override_settings
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.request import Request
+from rest_framework.test import APIClient
+
+from .authentication import (REVOKED, CachedTokenAuthentication,
+                             get_token_key, invalidate_tokens, local_tokens)
+from .catalog import get_version
+from .exports import get_export_name, purge_exports
+from .filters import RecipeFilter
+from .models import (AuthorStats, Favorite, FeedItem, Ingredient,
+                     IngredientInRecipe, Recipe, ShoppingCart,
+                     ShoppingListExport, Subscription, Tag, Unit)
+from .renditions import (RENDITIONS, generate_renditions,
+                         get_rendition_name)
+from .routers import REPLICA, check_connections
+from .throttling import CostRateThrottle, IPCostThrottle, LocalCounters
+from .views import RecipeViewSet
+
+
+User = get_user_model()
+
+
+@contextmanager
+def commit_callbacks():
+    """Run the on_commit callbacks registered inside the block, which
+    the transaction of a TestCase never commits.
+    """
+    start = len(connection.run_on_commit)
+    yield
+    while len(connection.run_on_commit) > start:
+        callbacks = connection.run_on_commit[start:]
+        del connection.run_on_commit[start:]
+        for _, callback in callbacks:
+            callback()
+
+
+class RecipeDataMixin:
+    """Authors with recipes of several tags and ingredients, and a
+    reader who follows them and marked some of the recipes.
+    """
+
+    RECIPES_PER_AUTHOR = 4
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(
+            username='reader', email='reader@example.com', password='pass'
+        )
+        cls.authors = [
+            User.objects.create_user(
+                username=f'author{number}',
+                email=f'author{number}@example.com', password='pass'
+            )
+            for number in range(3)
+        ]
+        cls.tags = [
+            Tag.objects.create(name=name, color=color, slug=name)
+            for name, color in (
+                ('breakfast', '#E26C2D'), ('lunch', '#49B64E'),
+                ('dinner', '#8775D2')
+            )
+        ]
+        units = [Unit.objects.create(name=name) for name in ('g', 'ml')]
+        cls.ingredients = [
+            Ingredient.objects.create(
+                name=f'ingredient {number}',
+                measurement_unit=units[number % 2]
+            )
+            for number in range(6)
+        ]
+        cls.recipes = []
+        for author in cls.authors:
+            Subscription.objects.create(user=cls.reader, author=author)
+            for number in range(cls.RECIPES_PER_AUTHOR):
+                recipe = Recipe.objects.create(
+                    author=author, name=f'{author.username} recipe {number}',
+                    text='Text', cooking_time=10, image='recipes/test.png'
+                )
+                recipe.tags.set(cls.tags[:number % 3 + 1])
+                ingredients = cls.ingredients[number:number + 3]
+                if number % 2:
+                    # Rows in another order than the ingredients.
+                    ingredients.reverse()
+                IngredientInRecipe.objects.bulk_create(
+                    IngredientInRecipe(
+                        recipe=recipe, ingredient=ingredient,
+                        amount=position + 1
+                    )
+                    for position, ingredient in enumerate(ingredients)
+                )
+                cls.recipes.append(recipe)
+        Favorite.objects.create(user=cls.reader, recipe=cls.recipes[0])
+        ShoppingCart.objects.create(user=cls.reader, recipe=cls.recipes[1])
+        cls.token = Token.objects.create(user=cls.reader)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+
+@override_settings(THROTTLE_ENABLED=False)
+class QueryBudgetTests(RecipeDataMixin, TestCase):
+    """Queries per request of the main endpoints. A budget exceeded
+    means a relation is loaded per row again.
+    """
+
+    def assert_budget(self, budget, url):
+        # The token cache and the catalog fingerprints are filled once
+        # per process, not per request.
+        self.client.get('/api/users/me/')
+        get_version('recipes')
+        with self.assertNumQueries(budget):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_recipe_list(self):
+        response = self.assert_budget(5, '/api/recipes/?limit=12')
+        self.assertEqual(len(response.data['results']), 12)
+
+    def test_recipe_list_cursor(self):
+        response = self.assert_budget(
+            4, '/api/recipes/?pagination=cursor&limit=12'
+        )
+        self.assertEqual(len(response.data['results']), 12)
+
+    def test_recipe_detail(self):
+        self.assert_budget(4, f'/api/recipes/{self.recipes[0].id}/')
+
+    def test_subscriptions(self):
+        response = self.assert_budget(
+            3, '/api/users/subscriptions/?recipes_limit=2'
+        )
+        self.assertEqual(len(response.data['results']), 3)
+
+    def test_users_list(self):
+        self.assert_budget(2, '/api/users/')
+
+
+@override_settings(THROTTLE_ENABLED=False)
+class RecipeTagFilterTests(RecipeDataMixin, TestCase):
+    """The tag filter matches with EXISTS lookups served by the
+    composite indexes of the recipe-tag table.
+    """
+
+    # The unique (recipe_id, tag_id) index and the (tag_id, recipe_id)
+    # one added by migration 0007.
+    RECIPE_TAG_INDEXES = (
+        'api_recipe_tags_recipe_id_tag_id_4e3605b4_uniq',
+        'api_recipe_tags_tag_recipe_idx',
+    )
+
+    def get_ids(self, query):
+        response = self.client.get(f'/api/recipes/?{query}&limit=100')
+        self.assertEqual(response.status_code, 200)
+        return [recipe['id'] for recipe in response.data['results']]
+
+    def get_expected(self, slugs, match):
+        return sorted((
+            recipe.id for recipe in self.recipes
+            if match(slug in {tag.slug for tag in recipe.tags.all()}
+                     for slug in slugs)
+        ), reverse=True)
+
+    def test_any_tag(self):
+        ids = self.get_ids('tags=lunch&tags=dinner')
+        self.assertEqual(ids, self.get_expected(('lunch', 'dinner'), any))
+
+    def test_all_tags(self):
+        ids = self.get_ids('tags=breakfast&tags=dinner&tags_match=all')
+        self.assertEqual(
+            ids, self.get_expected(('breakfast', 'dinner'), all)
+        )
+        self.assertTrue(ids)
+
+    def get_queryset(self, query):
+        request = Request(RequestFactory().get(f'/api/recipes/?{query}'))
+        return RecipeFilter(
+            request.query_params, Recipe.objects.all(), request=request
+        ).qs
+
+    def assert_index_lookup(self, query):
+        queryset = self.get_queryset(query)
+        self.assertNotIn('DISTINCT', str(queryset.query))
+        if connection.vendor == 'postgresql':
+            # The test tables are small enough for sequential scans.
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+        plan = queryset.explain()
+        self.assertTrue(
+            any(index in plan for index in self.RECIPE_TAG_INDEXES), plan
+        )
+        self.assertNotIn('Seq Scan on api_recipe_tags', plan)
+
+    def test_any_tag_plan(self):
+        self.assert_index_lookup('tags=lunch&tags=dinner')
+
+    def test_all_tags_plan(self):
+        self.assert_index_lookup('tags=lunch&tags=dinner&tags_match=all')
+
+
+@override_settings(THROTTLE_ENABLED=False)
+class ShoppingListExportTests(RecipeDataMixin, TestCase):
+    """Exports sharing a PDF of the same content survive its purge."""
+
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        media = override_settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+
+    def save_old_pdf(self, digest):
+        name = default_storage.save(
+            get_export_name(digest), ContentFile(b'%PDF-1.4')
+        )
+        created = time.time() - settings.SHOPPING_LIST_EXPORT_TTL - 60
+        os.utime(default_storage.path(name), (created, created))
+        return name
+
+    def test_purge_keeps_referenced_pdf(self):
+        name = self.save_old_pdf('a' * 64)
+        export = ShoppingListExport.objects.create(
+            user=self.reader, digest='a' * 64, content='{}',
+            status=ShoppingListExport.DONE
+        )
+        purge_exports()
+        self.assertTrue(default_storage.exists(name))
+        export.delete()
+        purge_exports()
+        self.assertFalse(default_storage.exists(name))
+
+    def test_uncached_pdf_is_queued(self):
+        response = self.client.get('/api/recipes/download_shopping_cart/')
+        self.assertEqual(response.status_code, 202)
+        export = ShoppingListExport.objects.get(user=self.reader)
+        self.assertEqual(export.status, ShoppingListExport.PENDING)
+        self.assertEqual(response.data['id'], export.id)
+        self.assertEqual(
+            response['Location'], f'/api/shopping_list_exports/{export.id}/'
+        )
+        default_storage.save(
+            get_export_name(export.digest), ContentFile(b'%PDF-1.4')
+        )
+        response = self.client.get('/api/recipes/download_shopping_cart/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertEqual(ShoppingListExport.objects.count(), 1)
+
+    def test_download_of_purged_pdf_is_queued_again(self):
+        export = ShoppingListExport.objects.create(
+            user=self.reader, digest='b' * 64, content='{}',
+            status=ShoppingListExport.DONE
+        )
+        response = self.client.get(
+            f'/api/shopping_list_exports/{export.id}/download/'
+        )
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data['status'], ShoppingListExport.PENDING)
+        export.refresh_from_db()
+        self.assertEqual(export.status, ShoppingListExport.PENDING)
+
+
+@override_settings(THROTTLE_ENABLED=False)
+class ReadModelParityTests(RecipeDataMixin, TestCase):
+    """api.read_model answers byte for byte like the serializers, with
+    the json_agg query on PostgreSQL and values() queries elsewhere.
+    """
+
+    def get_content(self, url, read_model):
+        # Both modes share the recipe page cache.
+        cache.clear()
+        with self.settings(RECIPE_READ_MODEL=read_model):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.content
+
+    def assert_parity(self, url):
+        self.assertEqual(
+            self.get_content(url, read_model=False),
+            self.get_content(url, read_model=True)
+        )
+
+    def test_list(self):
+        self.assert_parity('/api/recipes/?limit=12')
+
+    def test_list_anonymous(self):
+        self.client.credentials()
+        self.assert_parity('/api/recipes/?limit=12')
+
+    def test_list_personal(self):
+        self.assert_parity('/api/recipes/?is_favorited=true')
+
+    def test_detail(self):
+        for recipe in self.recipes[:4]:
+            self.assert_parity(f'/api/recipes/{recipe.id}/')
+
+
+class CachedTokenAuthenticationTests(RecipeDataMixin, TestCase):
+    """Cached tokens hold no password hash and stay revoked."""
+
+    def setUp(self):
+        super().setUp()
+        local_tokens.delete(self.token.key)
+
+    def authenticate(self):
+        return CachedTokenAuthentication().authenticate_credentials(
+            self.token.key
+        )
+
+    def test_cached_user(self):
+        response = self.client.get('/api/users/me/')
+        with self.assertNumQueries(0):
+            user, token = self.authenticate()
+        self.assertEqual(user.username, self.reader.username)
+        self.assertEqual(token.key, self.token.key)
+        self.assertNotIn(
+            self.reader.password, repr(cache.get(get_token_key(token.key)))
+        )
+        self.assertEqual(
+            self.client.get('/api/users/me/').content, response.content
+        )
+        # The password hash is loaded from the database when needed.
+        with self.assertNumQueries(1):
+            self.assertTrue(user.check_password('pass'))
+
+    def test_revoked_token_is_not_cached_again(self):
+        # A logout between the database read of a request and its
+        # cache write.
+        invalidate_tokens([self.token.key])
+        self.authenticate()
+        self.assertEqual(cache.get(get_token_key(self.token.key)), REVOKED)
+        self.assertIsNone(local_tokens.get(self.token.key))
+
+
+class CostThrottleTests(RecipeDataMixin, TestCase):
+    """Expensive and cheap requests draw from separate budgets."""
+
+    def setUp(self):
+        super().setUp()
+        counters = mock.patch('api.throttling.counters', LocalCounters())
+        counters.start()
+        self.addCleanup(counters.stop)
+
+    def test_heavy_requests_leave_the_light_budget(self):
+        # 120 cost units per minute, an export costs 10.
+        for _ in range(12):
+            response = self.client.post('/api/shopping_list_exports/')
+            self.assertEqual(response.status_code, 202)
+        response = self.client.post('/api/shopping_list_exports/')
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+        response = self.client.get(
+            '/api/recipes/download_shopping_cart/?type=text'
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_rejected_request_is_not_charged(self):
+        # The address budget rejects the second export, the user budget
+        # lets it through.
+        rates = {'ip_cost': '15/min'}
+        with mock.patch.dict(CostRateThrottle.THROTTLE_RATES, rates):
+            response = self.client.post('/api/shopping_list_exports/')
+            self.assertEqual(response.status_code, 202)
+            for _ in range(2):
+                response = self.client.post('/api/shopping_list_exports/')
+                self.assertEqual(response.status_code, 429)
+        # 110 of the 120 units of the user are left.
+        for _ in range(11):
+            response = self.client.post('/api/shopping_list_exports/')
+            self.assertEqual(response.status_code, 202)
+        response = self.client.post('/api/shopping_list_exports/')
+        self.assertEqual(response.status_code, 429)
+
+    @override_settings(INGREDIENT_SEARCH_INDEX=True)
+    def test_autocomplete_is_free(self):
+        rates = {'user_light_cost': '1/min', 'ip_light_cost': '1/min'}
+        with mock.patch.dict(CostRateThrottle.THROTTLE_RATES, rates):
+            for _ in range(5):
+                response = self.client.get('/api/ingredients/?name=ingr')
+                self.assertEqual(response.status_code, 200)
+
+    def test_forwarded_for_is_ignored_without_proxies(self):
+        request = RequestFactory().get(
+            '/', REMOTE_ADDR='192.0.2.1', HTTP_X_FORWARDED_FOR='203.0.113.9'
+        )
+        self.assertEqual(IPCostThrottle().get_ident(request), '192.0.2.1')
+
+
+@override_settings(THROTTLE_ENABLED=False)
+class IngredientAutocompleteTests(RecipeDataMixin, TestCase):
+    """Name prefixes match first, then prefixes of later words."""
+
+    def search(self, name):
+        response = self.client.get(f'/api/ingredients/?name={name}')
+        self.assertEqual(response.status_code, 200)
+        return [ingredient['name'] for ingredient in response.data]
+
+    def test_prefix(self):
+        self.assertEqual(
+            self.search('INGR'),
+            [ingredient.name for ingredient in self.ingredients]
+        )
+
+    def test_later_word(self):
+        self.assertEqual(self.search('3'), ['ingredient 3'])
+
+    def test_inside_word(self):
+        self.assertEqual(self.search('gredient'), [])
+
+
+@override_settings(THROTTLE_ENABLED=False)
+class CatalogCacheTests(RecipeDataMixin, TestCase):
+    """Catalogs answer 304 to their ETag until they change."""
+
+    def test_not_modified(self):
+        response = self.client.get('/api/tags/')
+        self.assertEqual(len(response.json()), len(self.tags))
+        etag = response['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(
+                '/api/tags/', HTTP_IF_NONE_MATCH=etag
+            )
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_gzip(self):
+        plain = self.client.get('/api/ingredients/')
+        compressed = self.client.get(
+            '/api/ingredients/', HTTP_ACCEPT_ENCODING='gzip, br'
+        )
+        self.assertEqual(compressed['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(compressed.content), plain.content)
+        self.assertNotEqual(compressed['ETag'], plain['ETag'])
+
+    def test_changed_catalog(self):
+        etag = self.client.get('/api/tags/')['ETag']
+        with commit_callbacks():
+            self.tags[0].name = 'brunch'
+            self.tags[0].save()
+        response = self.client.get('/api/tags/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertIn('brunch', [tag['name'] for tag in response.json()])
+
+
+@override_settings(THROTTLE_ENABLED=False)
+class RecipeUpdateTests(RecipeDataMixin, TestCase):
+    """A PATCH changes only the fields it sends."""
+
+    def setUp(self):
+        super().setUp()
+        self.recipe = self.recipes[0]
+        self.client.force_authenticate(self.recipe.author)
+
+    def test_partial_update(self):
+        tags = set(self.recipe.tags.values_list('id', flat=True))
+        amounts = list(
+            self.recipe.ingredientsinrecipe.values_list(
+                'ingredient_id', 'amount'
+            )
+        )
+        response = self.client.patch(
+            f'/api/recipes/{self.recipe.id}/', {'name': 'Renamed'},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.name, 'Renamed')
+        self.assertEqual(
+            set(self.recipe.tags.values_list('id', flat=True)), tags
+        )
+        self.assertEqual(
+            list(self.recipe.ingredientsinrecipe.values_list(
+                'ingredient_id', 'amount'
+            )),
+            amounts
+        )
+
+    def test_partial_update_of_tags(self):
+        response = self.client.patch(
+            f'/api/recipes/{self.recipe.id}/', {'tags': [self.tags[2].id]},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            list(self.recipe.tags.values_list('id', flat=True)),
+            [self.tags[2].id]
+        )
+        self.assertEqual(self.recipe.ingredientsinrecipe.count(), 3)
+
+
+@override_settings(THROTTLE_ENABLED=False)
+class RecipePageCacheTests(RecipeDataMixin, TestCase):
+    """Recipe list pages are shared between users, with each user's
+    flags laid over them, until a recipe changes.
+    """
+
+    URL = '/api/recipes/?limit=20'
+
+    def get_recipes(self, client=None):
+        response = (client or self.client).get(self.URL)
+        return {recipe['id']: recipe for recipe in response.json()['results']}
+
+    def test_overlay(self):
+        recipes = self.get_recipes()
+        self.assertTrue(recipes[self.recipes[0].id]['is_favorited'])
+        Favorite.objects.create(user=self.reader, recipe=self.recipes[2])
+        with mock.patch.object(RecipeViewSet, 'get_page_data') as render:
+            recipes = self.get_recipes()
+            anonymous = self.get_recipes(APIClient())
+        render.assert_not_called()
+        self.assertTrue(recipes[self.recipes[2].id]['is_favorited'])
+        self.assertTrue(recipes[self.recipes[1].id]['is_in_shopping_cart'])
+        self.assertTrue(
+            recipes[self.recipes[1].id]['author']['is_subscribed']
+        )
+        self.assertFalse(anonymous[self.recipes[0].id]['is_favorited'])
+        self.assertFalse(
+            anonymous[self.recipes[1].id]['is_in_shopping_cart']
+        )
+        self.assertFalse(
+            anonymous[self.recipes[1].id]['author']['is_subscribed']
+        )
+
+    def test_invalidation(self):
+        self.get_recipes()
+        with commit_callbacks(), \
+                mock.patch('api.signals.schedule_renditions'):
+            self.recipes[3].name = 'Renamed'
+            self.recipes[3].save()
+        recipes = self.get_recipes()
+        self.assertEqual(recipes[self.recipes[3].id]['name'], 'Renamed')
+
+
+class RenditionCleanupTests(RecipeDataMixin, TestCase):
+    """Renditions are removed with the image they were rendered from."""
+
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        media = override_settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+        # The worker closes its own connection, not the test's one.
+        connection_patch = mock.patch('api.renditions.connection')
+        connection_patch.start()
+        self.addCleanup(connection_patch.stop)
+        schedule_patch = mock.patch('api.signals.schedule_renditions')
+        schedule_patch.start()
+        self.addCleanup(schedule_patch.stop)
+        self.recipe = Recipe.objects.get(pk=self.recipes[0].pk)
+
+    def set_image(self, name):
+        output = BytesIO()
+        Image.new('RGB', (16, 16)).save(output, format='PNG')
+        name = default_storage.save(name, ContentFile(output.getvalue()))
+        with commit_callbacks():
+            self.recipe.image = name
+            self.recipe.save()
+        return name
+
+    def render(self, name):
+        rendered = generate_renditions(self.recipe.id, name)
+        self.recipe.refresh_from_db()
+        return rendered
+
+    def assert_renditions(self, name, exist):
+        for rendition in RENDITIONS:
+            self.assertEqual(
+                default_storage.exists(get_rendition_name(name, rendition)),
+                exist
+            )
+
+    def test_replaced_image(self):
+        old = self.set_image('recipes/old.png')
+        self.assertTrue(self.render(old))
+        self.assert_renditions(old, True)
+        new = self.set_image('recipes/new.png')
+        self.assert_renditions(old, False)
+        self.assertTrue(self.render(new))
+        self.assert_renditions(new, True)
+
+    def test_deleted_recipe(self):
+        name = self.set_image('recipes/old.png')
+        self.render(name)
+        with commit_callbacks():
+            self.recipe.delete()
+        self.assert_renditions(name, False)
+
+    def test_image_replaced_while_rendering(self):
+        old = self.set_image('recipes/old.png')
+        self.set_image('recipes/new.png')
+        self.assertFalse(self.render(old))
+        self.assert_renditions(old, False)
+
+
+@override_settings(THROTTLE_ENABLED=False)
+class MissingAuthorStatsTests(RecipeDataMixin, TestCase):
+    """Users without a stats row count as having no recipes or
+    followers.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.author = self.authors[0]
+        AuthorStats.objects.filter(user=self.author).delete()
+
+    def test_subscriptions(self):
+        response = self.client.get('/api/users/subscriptions/')
+        self.assertEqual(response.status_code, 200)
+        counts = {
+            author['id']: author['recipes_count']
+            for author in response.json()['results']
+        }
+        self.assertEqual(counts[self.author.id], 0)
+        self.assertEqual(
+            counts[self.authors[1].id], self.RECIPES_PER_AUTHOR
+        )
+
+    def test_subscribe(self):
+        Subscription.objects.filter(author=self.author).delete()
+        response = self.client.get(f'/api/users/{self.author.id}/subscribe/')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['recipes_count'], 0)
+
+    def test_admin(self):
+        admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass'
+        )
+        self.client.force_login(admin)
+        response = self.client.get('/admin/auth/user/?o=3')
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, self.author.username)
+
+
+@override_settings(THROTTLE_ENABLED=False, SERVER_TIMING=False)
+class ServerTimingTests(RecipeDataMixin, TestCase):
+    """Only staff users get the timings, unless SERVER_TIMING is on."""
+
+    def test_hidden(self):
+        response = self.client.get('/api/recipes/')
+        self.assertNotIn('Server-Timing', response)
+
+    def test_staff(self):
+        staff = User.objects.create_user(
+            username='staff', email='staff@example.com', is_staff=True
+        )
+        self.client.force_authenticate(staff)
+        response = self.client.get('/api/recipes/')
+        self.assertRegex(
+            response['Server-Timing'], r'serializer;dur=\d+\.\d'
+        )
+        self.assertNotIn('serializer;dur=0.0,', response['Server-Timing'])
+
+    def test_setting(self):
+        with self.settings(SERVER_TIMING=True):
+            response = APIClient().get('/api/tags/')
+        self.assertIn('total;dur=', response['Server-Timing'])
+
+
+@override_settings(THROTTLE_ENABLED=False)
+class SelectionToggleTests(RecipeDataMixin, TestCase):
+    """Favorites and the cart are toggled one or many recipes at a
+    time, with the recipe counters kept in step.
+    """
+
+    def get_counts(self, field):
+        return dict(Recipe.objects.filter(
+            pk__in=[recipe.pk for recipe in self.recipes[:6]]
+        ).values_list('pk', field))
+
+    def test_bulk_favorite(self):
+        first, second, third, *_ = self.recipes
+        response = self.client.post(
+            '/api/recipes/favorite/',
+            {'recipes': [first.id, second.id, third.id, third.id, 10 ** 6]},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json(), {'added': 2})
+        counts = self.get_counts('favorites_count')
+        self.assertEqual(
+            [counts[first.id], counts[second.id], counts[third.id]],
+            [1, 1, 1]
+        )
+        response = self.client.delete(
+            '/api/recipes/favorite/',
+            {'recipes': [first.id, second.id, self.recipes[5].id]},
+            format='json'
+        )
+        self.assertEqual(response.json(), {'removed': 2})
+        counts = self.get_counts('favorites_count')
+        self.assertEqual(
+            [counts[first.id], counts[second.id], counts[third.id]],
+            [0, 0, 1]
+        )
+        self.assertEqual(
+            list(Favorite.objects.filter(user=self.reader).values_list(
+                'recipe_id', flat=True
+            )),
+            [third.id]
+        )
+
+    def test_bulk_shopping_cart(self):
+        recipe_ids = [recipe.id for recipe in self.recipes[:4]]
+        response = self.client.post(
+            '/api/recipes/shopping_cart/', {'recipes': recipe_ids},
+            format='json'
+        )
+        self.assertEqual(response.json(), {'added': 3})
+        counts = self.get_counts('shopping_cart_count')
+        self.assertEqual([counts[id] for id in recipe_ids], [1, 1, 1, 1])
+        response = self.client.delete(
+            '/api/recipes/shopping_cart/', {'recipes': recipe_ids},
+            format='json'
+        )
+        self.assertEqual(response.json(), {'removed': 4})
+        counts = self.get_counts('shopping_cart_count')
+        self.assertEqual([counts[id] for id in recipe_ids], [0, 0, 0, 0])
+
+    def test_single_toggle(self):
+        recipe = self.recipes[2]
+        url = f'/api/recipes/{recipe.id}/favorite/'
+        self.assertEqual(self.client.get(url).status_code, 201)
+        self.assertEqual(self.client.get(url).status_code, 400)
+        self.assertEqual(self.get_counts('favorites_count')[recipe.id], 1)
+        self.assertEqual(self.client.delete(url).status_code, 204)
+        self.assertEqual(self.get_counts('favorites_count')[recipe.id], 0)
+
+    def test_limit(self):
+        response = self.client.post(
+            '/api/recipes/favorite/',
+            {'recipes': list(range(1, settings.BULK_RECIPES_LIMIT + 2))},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(THROTTLE_ENABLED=False)
+class RecipeSearchTests(RecipeDataMixin, TestCase):
+    """The full text search of SQLite and PostgreSQL ranks name matches
+    above ingredient matches above text matches.
+    """
+
+    def setUp(self):
+        super().setUp()
+        schedule_patch = mock.patch('api.signals.schedule_renditions')
+        schedule_patch.start()
+        self.addCleanup(schedule_patch.stop)
+        paprika = Ingredient.objects.create(
+            name='paprika',
+            measurement_unit=self.ingredients[0].measurement_unit
+        )
+        author = self.authors[0]
+        with commit_callbacks():
+            self.in_text = Recipe.objects.create(
+                author=author, name='Goulash', cooking_time=90,
+                text='Stew the beef with paprika.', image='recipes/test.png'
+            )
+            self.in_name = Recipe.objects.create(
+                author=author, name='Paprika chicken', cooking_time=40,
+                text='Fry the chicken.', image='recipes/test.png'
+            )
+            self.in_ingredients = Recipe.objects.create(
+                author=author, name='Lecso', cooking_time=30,
+                text='Stew the peppers.', image='recipes/test.png'
+            )
+            IngredientInRecipe.objects.create(
+                recipe=self.in_ingredients, ingredient=paprika, amount=5
+            )
+
+    def search(self, value):
+        response = self.client.get('/api/recipes/', {'search': value})
+        self.assertEqual(response.status_code, 200)
+        return [recipe['id'] for recipe in response.json()['results']]
+
+    def test_ranking(self):
+        self.assertEqual(
+            self.search('paprika'),
+            [self.in_name.id, self.in_ingredients.id, self.in_text.id]
+        )
+
+    def test_every_word(self):
+        self.assertEqual(
+            self.search('paprika stew'),
+            [self.in_ingredients.id, self.in_text.id]
+        )
+
+    def test_index_follows_changes(self):
+        with commit_callbacks():
+            self.in_name.name = 'Roast chicken'
+            self.in_name.save()
+        self.assertEqual(
+            self.search('paprika'), [self.in_ingredients.id, self.in_text.id]
+        )
+        self.assertEqual(self.search('roast'), [self.in_name.id])
+
+
+@override_settings(THROTTLE_ENABLED=False, RECIPE_LIST_CACHE_TIMEOUT=0)
+class ReplicaRoutingTests(RecipeDataMixin, TestCase):
+    """Safe requests read from the replica, a client that wrote reads
+    from the primary for REPLICA_STICKY_SECONDS.
+
+    The replica is a second, empty SQLite database, reads that reach it
+    find no recipes.
+    """
+
+    databases = {'default', REPLICA}
+
+    @classmethod
+    def setUpClass(cls):
+        connections.databases[REPLICA] = {
+            'ENGINE': 'django.db.backends.sqlite3', 'NAME': ':memory:',
+            'CONN_MAX_AGE': None, 'CONN_HEALTH_CHECK_INTERVAL': 30,
+        }
+        with connections[REPLICA].schema_editor() as editor:
+            for model in apps.get_models():
+                editor.create_model(model)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections[REPLICA].connection.close()
+        del connections[REPLICA]
+        del connections.databases[REPLICA]
+
+    def count_recipes(self):
+        response = self.client.get('/api/recipes/')
+        self.assertEqual(response.status_code, 200)
+        return response.json()['count']
+
+    def test_reads_go_to_replica(self):
+        self.assertEqual(self.count_recipes(), 0)
+
+    def test_write_pins_client_to_primary(self):
+        response = self.client.post(
+            '/api/recipes/favorite/', {'recipes': [self.recipes[2].id]},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.count_recipes(), len(self.recipes))
+        other = APIClient()
+        self.assertEqual(other.get('/api/recipes/').json()['count'], 0)
+
+    def test_write_in_safe_request_pins_client(self):
+        response = self.client.get(
+            f'/api/recipes/{self.recipes[2].id}/favorite/'
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.count_recipes(), len(self.recipes))
+
+    def test_pin_expires(self):
+        self.client.delete(f'/api/recipes/{self.recipes[0].id}/favorite/')
+        self.assertEqual(self.count_recipes(), len(self.recipes))
+        later = time.time() + settings.REPLICA_STICKY_SECONDS + 1
+        with mock.patch('time.time', return_value=later):
+            self.assertEqual(self.count_recipes(), 0)
+
+    def test_health_check_interval(self):
+        replica = connections[REPLICA]
+        replica.ensure_connection()
+        now = time.monotonic()
+        # Outside of the test transaction, which check_connections skips.
+        outside = mock.patch.object(replica, 'in_atomic_block', False)
+        pings = mock.patch.object(
+            replica, 'is_usable', wraps=replica.is_usable
+        )
+        clock = mock.patch('api.routers.time.monotonic')
+        with outside, pings as is_usable, clock as monotonic:
+            for offset in (0, 10, 29, 30, 45, 61):
+                monotonic.return_value = now + offset
+                check_connections()
+        # Pinged at 30 and 61, not on every request in between.
+        self.assertEqual(is_usable.call_count, 2)
+
+
+@override_settings(THROTTLE_ENABLED=False)
+class FeedTests(RecipeDataMixin, TestCase):
+    """Feeds get the new recipes of followed authors and lose the ones
+    of unfollowed authors.
+    """
+
+    def get_feed(self, client=None):
+        response = (client or self.client).get(
+            '/api/recipes/feed/', {'limit': 50}
+        )
+        self.assertEqual(response.status_code, 200)
+        return [recipe['id'] for recipe in response.json()['results']]
+
+    def recipe_ids(self, author):
+        return [
+            recipe.id for recipe in reversed(self.recipes)
+            if recipe.author_id == author.id
+        ]
+
+    def test_feed(self):
+        self.assertEqual(
+            self.get_feed(), [recipe.id for recipe in reversed(self.recipes)]
+        )
+
+    def test_fan_out(self):
+        follower = APIClient()
+        follower.force_authenticate(self.authors[1])
+        Subscription.objects.create(
+            user=self.authors[1], author=self.authors[2]
+        )
+        self.assertEqual(
+            self.get_feed(follower), self.recipe_ids(self.authors[2])
+        )
+        recipe = Recipe.objects.create(
+            author=self.authors[0], name='New', text='Text',
+            cooking_time=5, image='recipes/test.png'
+        )
+        self.assertEqual(self.get_feed()[0], recipe.id)
+        self.assertNotIn(recipe.id, self.get_feed(follower))
+
+    def test_trim_and_backfill(self):
+        author = self.authors[0]
+        url = f'/api/users/{author.id}/subscribe/'
+        self.assertEqual(self.client.delete(url).status_code, 204)
+        feed = self.get_feed()
+        self.assertEqual(feed, [
+            recipe.id for recipe in reversed(self.recipes)
+            if recipe.author_id != author.id
+        ])
+        self.assertEqual(
+            FeedItem.objects.filter(user=self.reader).count(), len(feed)
+        )
+        self.assertEqual(self.client.get(url).status_code, 201)
+        self.assertEqual(
+            self.get_feed(), [recipe.id for recipe in reversed(self.recipes)]
+        )
+
+
+@override_settings(THROTTLE_ENABLED=False)
+class ShoppingListUnitTests(RecipeDataMixin, TestCase):
+    """Amounts of one ingredient in convertible units are summed into
+    one line in the larger unit.
+    """
+
+    def add_to_cart(self, *items):
+        recipe = Recipe.objects.create(
+            author=self.authors[0], name='Cart recipe', text='Text',
+            cooking_time=5, image='recipes/test.png'
+        )
+        for name, unit, amount in items:
+            unit, _ = Unit.objects.get_or_create(name=unit)
+            ingredient, _ = Ingredient.objects.get_or_create(
+                name=name, measurement_unit=unit
+            )
+            IngredientInRecipe.objects.create(
+                recipe=recipe, ingredient=ingredient, amount=amount
+            )
+        ShoppingCart.objects.create(user=self.reader, recipe=recipe)
+
+    def get_lines(self):
+        ShoppingCart.objects.filter(recipe=self.recipes[1]).delete()
+        response = self.client.get(
+            '/api/recipes/download_shopping_cart/', {'type': 'text'}
+        )
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode().splitlines()
+
+    def test_grams_and_kilograms(self):
+        self.add_to_cart(('flour', 'g', 500))
+        self.add_to_cart(('flour', 'kg', 1), ('sugar', 'g', 200))
+        self.assertEqual(
+            self.get_lines(), ['flour - 1.5 kg', 'sugar - 200 g']
+        )
+
+    def test_millilitres_and_litres(self):
+        self.add_to_cart(('milk', 'ml', 250), ('milk', ' l', 2))
+        self.assertEqual(self.get_lines(), ['milk - 2.25 l'])
+
+    def test_other_units_stay_apart(self):
+        self.add_to_cart(('egg', 'pcs.', 2), ('egg', 'g', 60))
+        self.add_to_cart(('egg', 'piece', 1))
+        self.assertEqual(self.get_lines(), ['egg - 60 g', 'egg - 3 pcs.'])
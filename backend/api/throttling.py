@@ -0,0 +1,215 @@
+import math
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class LocalCounters:
+    """Window counters in the memory of this process."""
+
+    # Expired counters are dropped once there are more than this.
+    PURGE_SIZE = 10000
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {}
+
+    def get_many(self, keys):
+        now = time.monotonic()
+        counts = {}
+        with self._lock:
+            for key in keys:
+                count, expires = self._counts.get(key, (0, 0))
+                if expires > now:
+                    counts[key] = count
+        return counts
+
+    def add(self, key, cost, timeout):
+        now = time.monotonic()
+        with self._lock:
+            count, expires = self._counts.get(key, (0, 0))
+            if expires <= now:
+                count = 0
+            self._counts[key] = (count + cost, now + timeout)
+            if len(self._counts) > self.PURGE_SIZE:
+                self._counts = {
+                    key: value for key, value in self._counts.items()
+                    if value[1] > now
+                }
+
+
+class CacheCounters:
+    """Window counters in the Django cache, shared by the processes
+    when the cache is.
+    """
+
+    def get_many(self, keys):
+        return cache.get_many(keys)
+
+    def add(self, key, cost, timeout):
+        cache.add(key, 0, timeout=timeout)
+        try:
+            cache.incr(key, cost)
+        except ValueError:
+            cache.set(key, cost, timeout=timeout)
+
+
+class ThrottleMetrics:
+    """Requests and cost let through or throttled per scope."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._requests = defaultdict(int)
+        self._cost = defaultdict(int)
+
+    def observe(self, scope, result, cost):
+        with self._lock:
+            self._requests[(scope, result)] += 1
+            self._cost[(scope, result)] += cost
+
+    def render(self):
+        """Prometheus text exposition format."""
+        with self._lock:
+            requests = sorted(self._requests.items())
+            cost = sorted(self._cost.items())
+        lines = ['# TYPE foodgram_throttle_requests_total counter']
+        lines.extend(
+            'foodgram_throttle_requests_total'
+            f'{{scope="{scope}",result="{result}"}} {count}'
+            for (scope, result), count in requests
+        )
+        lines.append('# TYPE foodgram_throttle_cost_total counter')
+        lines.extend(
+            'foodgram_throttle_cost_total'
+            f'{{scope="{scope}",result="{result}"}} {count}'
+            for (scope, result), count in cost
+        )
+        return '\n'.join(lines) + '\n'
+
+
+# Budgets of the expensive and the cheap requests, a few PDFs must not
+# use up the one of ingredient autocomplete.
+HEAVY = 'heavy'
+LIGHT = 'light'
+
+counters = (
+    CacheCounters() if settings.THROTTLE_STORAGE == 'cache'
+    else LocalCounters()
+)
+metrics = ThrottleMetrics()
+
+
+class CostRateThrottle(SimpleRateThrottle):
+    """Sliding window counter of the request costs of a client.
+
+    The rate is a budget of cost units per period, the view tells the
+    budget and the cost of a request with ``get_throttle_cost``. Every
+    throttle counts the requests of its ``budget`` only, requests
+    costing nothing are neither checked nor counted.
+
+    The costs of the current and the previous fixed windows are kept,
+    the previous one counts with the share of it still inside the
+    sliding window. ``allow_request`` only checks the budget, the view
+    calls ``charge`` once every throttle let the request through (see
+    ThrottleCostMixin). Concurrent requests can overshoot the budget
+    slightly, the check and the increment are separate.
+    """
+
+    budget = HEAVY
+
+    def get_cost(self, request, view):
+        get_throttle_cost = getattr(view, 'get_throttle_cost', None)
+        if get_throttle_cost is None:
+            return 0
+        budget, cost = get_throttle_cost(request)
+        return cost if budget == self.budget else 0
+
+    def allow_request(self, request, view):
+        self.charge_key = None
+        if not settings.THROTTLE_ENABLED:
+            return True
+        self.cost = self.get_cost(request, view)
+        if not self.cost or self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+        self.now = self.timer()
+        window = int(self.now // self.duration)
+        self.elapsed = self.now - window * self.duration
+        previous_key = f'{self.key}:{window - 1}'
+        current_key = f'{self.key}:{window}'
+        counts = counters.get_many([previous_key, current_key])
+        self.previous = counts.get(previous_key, 0)
+        self.current = counts.get(current_key, 0)
+        if self.get_used() + self.cost > self.num_requests:
+            metrics.observe(self.scope, 'throttled', self.cost)
+            return False
+        self.charge_key = current_key
+        return True
+
+    def charge(self):
+        """Count the cost of a request every throttle allowed."""
+        if self.charge_key is None:
+            return
+        counters.add(self.charge_key, self.cost, timeout=2 * self.duration)
+        metrics.observe(self.scope, 'allowed', self.cost)
+
+    def get_used(self):
+        share = 1 - self.elapsed / self.duration
+        return self.previous * share + self.current
+
+    def wait(self):
+        """Seconds until the window has room for the request."""
+        free = self.num_requests - self.cost
+        if free < 0:
+            return self.duration
+        if self.current <= free:
+            # The previous window has to slide out far enough.
+            share = (free - self.current) / self.previous
+            wait = self.duration * (1 - share) - self.elapsed
+        else:
+            # The current window becomes the previous one first.
+            wait = self.duration - self.elapsed
+            wait += self.duration * (1 - free / self.current)
+        return max(1, math.ceil(wait))
+
+
+class UserCostThrottle(CostRateThrottle):
+    """Budget of an authenticated user for expensive requests."""
+    scope = 'user_cost'
+
+    def get_cache_key(self, request, view):
+        if not request.user.is_authenticated:
+            return None
+        return self.cache_format % {
+            'scope': self.scope, 'ident': request.user.pk
+        }
+
+
+class UserLightCostThrottle(UserCostThrottle):
+    """Budget of an authenticated user for cheap requests."""
+    scope = 'user_light_cost'
+    budget = LIGHT
+
+
+class IPCostThrottle(CostRateThrottle):
+    """Budget of a client address for expensive requests, shared by its
+    users.
+    """
+    scope = 'ip_cost'
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {
+            'scope': self.scope, 'ident': self.get_ident(request)
+        }
+
+
+class IPLightCostThrottle(IPCostThrottle):
+    """Budget of a client address for cheap requests."""
+    scope = 'ip_light_cost'
+    budget = LIGHT
@@ -1,7 +1,8 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
-from .views import IngredientViewSet, RecipeViewSet, TagViewSet
+from .views import (IngredientViewSet, MetricsView, RecipeViewSet,
+                    ShoppingListExportViewSet, TagViewSet)
 
 
 app_name = 'api'
@@ -10,7 +11,12 @@ router = DefaultRouter()
 router.register(r'tags', TagViewSet, basename='tags')
 router.register(r'recipes', RecipeViewSet, basename='recipes')
 router.register(r'ingredients', IngredientViewSet, basename='ingredients')
+router.register(
+    r'shopping_list_exports', ShoppingListExportViewSet,
+    basename='shopping_list_exports'
+)
 
 urlpatterns = [
+    path('metrics/', MetricsView.as_view(), name='metrics'),
     path('', include(router.urls))
 ]
@@ -1,6 +1,8 @@
 from datetime import datetime as dt
+from functools import lru_cache
+from tempfile import SpooledTemporaryFile
 
-from django.http import HttpResponse
+from django.http import FileResponse
 from reportlab.lib.pagesizes import A4
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
@@ -11,38 +13,73 @@ FONT = 'DejaVuSerif'
 TITLE = 'List shopping of recipes'
 SIGN = 'Foodgram by @z.abduev'
 FILENAME = 'list_shopping_of_recipes'
-DATE = f'{dt.now().date().strftime("%d/%m/%y")}'
 HEIGHT = 650
+BOTTOM_MARGIN = 50
+LINE_HEIGHT = 25
+SPOOL_MAX_SIZE = 1024 * 1024
 
 
-def page_draw(pdf_obj):
-    page = canvas.Canvas(pdf_obj, pagesize=A4)
-    page.setTitle('Shopping list')
-    page.setFont('DejaVuSerif', 10)
-    page.drawCentredString(50, 820, DATE)
+@lru_cache(maxsize=None)
+def register_font():
+    """Register the TTF font once per process."""
+    pdfmetrics.registerFont(TTFont(FONT, f'{FONT}.ttf'))
+
+
+def page_draw(page, date):
+    page.setFont(FONT, 10)
+    page.drawCentredString(50, 820, date)
     page.drawCentredString(500, 820, SIGN)
-    page.setFont('DejaVuSerif', 20)
+    page.setFont(FONT, 20)
     page.drawCentredString(300, 740, TITLE)
-    page.setFont('DejaVuSerif', 16)
+    page.setFont(FONT, 16)
     page.line(30, 720, 565, 720)
     return page
 
 
-def fill_page_with_data(data, page, height=HEIGHT):
-    for key, item in data.items():
+def fill_pages_with_data(ingredients, page, date, height=HEIGHT):
+    """Draw ingredient lines, starting a new page when one is full."""
+    page_draw(page, date)
+    for item in ingredients:
+        if height < BOTTOM_MARGIN:
+            page.showPage()
+            page_draw(page, date)
+            height = HEIGHT
         page.drawString(
             50, height,
-            f"{key} - {item['amount']} {item['measurement_unit']}."
+            f"{item['name']} - {item['amount']} {item['measurement_unit']}."
         )
-        height -= 25
+        height -= LINE_HEIGHT
     page.showPage()
     page.save()
 
 
-def download_to_pdf(data):
-    pdf_obj = HttpResponse(content_type='application/pdf')
-    pdf_obj['Content-Disposition'] = f'attachment; filename={FILENAME}.pdf'
-    pdfmetrics.registerFont(TTFont('DejaVuSerif', 'DejaVuSerif.ttf'))
-    page = page_draw(pdf_obj)
-    fill_page_with_data(data, page)
+def get_date():
+    return dt.now().date().strftime('%d/%m/%y')
+
+
+def render_pdf(ingredients, date):
+    """Render aggregated ingredients into a PDF file.
+
+    The document is spooled in memory and moves to a temporary file
+    once it outgrows ``SPOOL_MAX_SIZE``.
+    """
+    register_font()
+    pdf_obj = SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    page = canvas.Canvas(pdf_obj, pagesize=A4)
+    page.setTitle('Shopping list')
+    fill_pages_with_data(ingredients, page, date)
+    pdf_obj.seek(0)
     return pdf_obj
+
+
+def render_pdf_content(ingredients, date):
+    """PDF bytes, for worker processes that cannot send a file back."""
+    with render_pdf(ingredients, date) as pdf_obj:
+        return pdf_obj.read()
+
+
+def pdf_response(pdf_obj):
+    return FileResponse(
+        pdf_obj, as_attachment=True,
+        filename=f'{FILENAME}.pdf', content_type='application/pdf'
+    )
@@ -1,52 +1,110 @@
-from django.db.models import Exists, OuterRef
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.db.models import Exists, OuterRef, Prefetch
+from django.http import Http404, HttpResponse
 from django.shortcuts import get_object_or_404
+from django.urls import reverse
 from rest_framework import mixins, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.exceptions import ValidationError
-from rest_framework.permissions import (IsAuthenticated,
+from rest_framework.permissions import (IsAdminUser, IsAuthenticated,
                                         IsAuthenticatedOrReadOnly)
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from django_filters.rest_framework import DjangoFilterBackend
 
-from .utils import download_to_pdf
+from . import read_model, recipe_cache
+from .autocomplete import ingredient_index
+from .exports import (enqueue_export, get_cached_pdf, get_export_name,
+                      requeue_export)
+from .instrumentation import registry, timed_serialization
+from .selections import add_recipes, remove_recipes
+from .shopping_list import (CONTENT_TYPES, get_shopping_list,
+                            shopping_list_response)
+from .throttling import HEAVY, LIGHT
+from .throttling import metrics as throttle_metrics
+from .utils import pdf_response
 from .filters import IngredientFilter, RecipeFilter
-from .models import (Favorite, Ingredient, IngredientInRecipe,
-                     Recipe, ShoppingCart, Tag)
+from .models import (Favorite, FeedItem, Ingredient, IngredientInRecipe,
+                     Recipe, ShoppingCart, ShoppingListExport,
+                     Subscription, Tag)
+from .pagination import FeedCursorPagination
 from .serializers import (FavoriteSerializer, IngredientSerializer,
-                          RecipeListSerializer, RecipePostSerializer,
-                          ShoppingCartSerializer, TagsSerializer)
-from .custom_mixins import AtomicModelViewSetMixin
+                          RecipeIdsSerializer, RecipeListSerializer,
+                          RecipePostSerializer, ShoppingCartSerializer,
+                          ShoppingListExportSerializer, TagsSerializer)
+from .custom_mixins import (AtomicModelViewSetMixin, CachedCatalogListMixin,
+                            ThrottleCostMixin)
 from users.permissions import IsCurrentUserOrSAFEMETHODS
 
 
-class TagViewSet(mixins.ListModelMixin,
+User = get_user_model()
+
+
+class TagViewSet(CachedCatalogListMixin,
                  mixins.CreateModelMixin,
                  mixins.RetrieveModelMixin,
                  viewsets.GenericViewSet):
+    catalog = 'tags'
     queryset = Tag.objects.all()
     serializer_class = TagsSerializer
     permission_classes = (IsAuthenticatedOrReadOnly,)
     pagination_class = None
 
 
-class IngredientViewSet(mixins.ListModelMixin,
+class IngredientViewSet(ThrottleCostMixin,
+                        CachedCatalogListMixin,
                         mixins.RetrieveModelMixin,
                         viewsets.GenericViewSet):
-    queryset = Ingredient.objects.all()
+    catalog = 'ingredients'
+    queryset = Ingredient.objects.select_related('measurement_unit')
     serializer_class = IngredientSerializer
     filter_backends = (DjangoFilterBackend,)
     filterset_class = IngredientFilter
     permission_classes = (IsAuthenticatedOrReadOnly,)
     pagination_class = None
 
+    def get_throttle_cost(self, request):
+        """Only the search by name in the database is throttled, the
+        whole list is served from the cache and the search from the
+        in-memory index costs no more, however fast the user types
+        """
+        if (self.action == 'list' and request.query_params.get('name')
+                and not settings.INGREDIENT_SEARCH_INDEX):
+            return LIGHT, 1
+        return None, 0
+
+    def list(self, request, *args, **kwargs):
+        """Autocomplete by name from the in-memory index when enabled"""
+        name = request.query_params.get('name')
+        if not name:
+            return super().list(request, *args, **kwargs)
+        limit = settings.INGREDIENT_SEARCH_LIMIT
+        if settings.INGREDIENT_SEARCH_INDEX:
+            return Response(ingredient_index.search(name, limit))
+        queryset = self.filter_queryset(self.get_queryset())[:limit]
+        serializer = self.get_serializer(queryset, many=True)
+        with timed_serialization():
+            return Response(serializer.data)
 
-class RecipeViewSet(AtomicModelViewSetMixin,
+
+class RecipeViewSet(ThrottleCostMixin,
+                    AtomicModelViewSetMixin,
                     mixins.ListModelMixin,
                     mixins.RetrieveModelMixin,
                     viewsets.GenericViewSet):
     permission_classes = (IsCurrentUserOrSAFEMETHODS,)
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
+    # Writes decode a base64 image, the PDF is rendered on a miss.
+    throttle_costs = {
+        'create': (HEAVY, 10),
+        'update': (HEAVY, 10),
+        'partial_update': (HEAVY, 10),
+        'download_shopping_cart': (HEAVY, 10),
+    }
 
     def get_queryset(self):
         favorites = Favorite.objects.filter(
@@ -57,20 +115,153 @@ class RecipeViewSet(AtomicModelViewSetMixin,
             recipe=OuterRef('pk'),
             user_id=self.request.user.id
         )
+        subscriptions = Subscription.objects.filter(
+            author=OuterRef('pk'),
+            user_id=self.request.user.id
+        )
+        authors = User.objects.annotate(is_subscribed=Exists(subscriptions))
+        # Ordered like api.read_model builds them.
+        ingredients = IngredientInRecipe.objects.select_related(
+            'ingredient__measurement_unit'
+        ).order_by('id')
         queryset = Recipe.objects.annotate(
             is_favorited=Exists(favorites),
             is_in_shopping_cart=Exists(shopping_cart)
+        ).prefetch_related(
+            Prefetch('author', queryset=authors),
+            Prefetch('ingredientsinrecipe', queryset=ingredients),
+            'tags',
         ).order_by('-id')
         return queryset
 
+    def list(self, request, *args, **kwargs):
+        """Serve shared pages from the cache with the user's flags"""
+        if (request.query_params.get('search')
+                and self.paginator.use_cursor(request)):
+            # The cursor would order by id instead of the rank.
+            raise ValidationError({
+                'errors': 'Search results are paginated by page number!'
+            })
+        key = recipe_cache.get_page_key(request)
+        if key is None:
+            return self.data_response(self.get_page_data(request))
+        data = recipe_cache.get_page(key, request.user)
+        if data is None:
+            data = self.get_page_data(request)
+            recipe_cache.set_page(key, data)
+        return self.data_response(data)
+
+    def get_page_data(self, request):
+        queryset = self.filter_queryset(self.get_queryset())
+        if settings.RECIPE_READ_MODEL:
+            page = self.paginate_queryset(
+                queryset.prefetch_related(None).values('id')
+            )
+            recipes = read_model.get_recipes(
+                [row['id'] for row in page], request
+            )
+        else:
+            page = self.paginate_queryset(queryset)
+            with timed_serialization():
+                recipes = self.get_serializer(page, many=True).data
+        return self.get_paginated_response(recipes).data
+
+    def retrieve(self, request, *args, **kwargs):
+        if not settings.RECIPE_READ_MODEL:
+            serializer = self.get_serializer(self.get_object())
+            with timed_serialization():
+                return Response(serializer.data)
+        try:
+            recipe_id = int(kwargs['pk'])
+        except ValueError:
+            raise Http404
+        recipes = read_model.get_recipes([recipe_id], request)
+        if not recipes:
+            raise Http404
+        return self.data_response(recipes[0])
+
+    def data_response(self, data):
+        """JSON bytes encoded at once with the read model, like the
+        cached catalogs, a DRF Response otherwise.
+        """
+        if not settings.RECIPE_READ_MODEL:
+            return Response(data)
+        return HttpResponse(
+            JSONRenderer().render(data), content_type='application/json'
+        )
+
+    def get_throttle_cost(self, request):
+        """Text and CSV shopping lists are cheap next to the PDF"""
+        if (self.action == 'download_shopping_cart'
+                and request.query_params.get('type', 'pdf') != 'pdf'):
+            return LIGHT, 1
+        return super().get_throttle_cost(request)
+
     def get_serializer_class(self):
-        if self.action in ('list', 'retrieve'):
+        if self.action in ('list', 'retrieve', 'feed'):
             return RecipeListSerializer
         return RecipePostSerializer
 
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
+    def add_or_remove(self, request, pk, model, serializer_class, error):
+        """Add the recipe with one INSERT ... ON CONFLICT DO NOTHING or
+        remove it with one DELETE.
+        """
+        try:
+            recipe_id = int(pk)
+        except ValueError:
+            raise Http404
+        if request.method == 'DELETE':
+            remove_recipes(model, request.user, [recipe_id])
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        added = add_recipes(model, request.user, [recipe_id])
+        recipe = get_object_or_404(Recipe, pk=recipe_id)
+        if not added:
+            raise ValidationError({'errors': error})
+        serializer = serializer_class(recipe)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    def bulk_add_or_remove(self, request, model):
+        """Add or remove the ``recipes`` ids of the request body"""
+        serializer = RecipeIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        recipe_ids = serializer.validated_data['recipes']
+        if request.method == 'DELETE':
+            removed = remove_recipes(model, request.user, recipe_ids)
+            return Response({'removed': removed})
+        added = add_recipes(model, request.user, recipe_ids)
+        return Response({'added': added}, status=status.HTTP_201_CREATED)
+
+    @action(
+        detail=False,
+        methods=['get'],
+        permission_classes=[IsAuthenticated]
+    )
+    def feed(self, request):
+        """Recipes of the followed authors, newest first.
+
+        The page of recipe ids is read from the user's feed items only.
+        """
+        paginator = FeedCursorPagination()
+        items = paginator.paginate_queryset(
+            FeedItem.objects.filter(user=request.user).values('recipe_id'),
+            request, view=self
+        )
+        recipe_ids = [item['recipe_id'] for item in items]
+        if settings.RECIPE_READ_MODEL:
+            recipes = read_model.get_recipes(recipe_ids, request)
+        else:
+            serializer = self.get_serializer(
+                self.get_queryset().filter(id__in=recipe_ids), many=True
+            )
+            with timed_serialization():
+                recipes = serializer.data
+        return self.data_response(
+            paginator.get_paginated_response(recipes).data
+        )
+
     @action(
         detail=True,
         methods=['get', 'delete'],
@@ -78,25 +269,22 @@ class RecipeViewSet(AtomicModelViewSetMixin,
     )
     def favorite(self, request, pk):
         """Favorites recipes of authenticated user"""
-        recipe = get_object_or_404(Recipe, pk=pk)
-        user = self.request.user
-        if request.method == 'DELETE':
-            Favorite.objects.filter(
-                user=user, recipe=recipe
-            ).delete()
-            return Response(status=status.HTTP_204_NO_CONTENT)
-        if request.method == 'GET' and not Favorite.objects.filter(
-            user=user, recipe=recipe
-        ).exists():
-            Favorite.objects.create(user=user, recipe=recipe)
-            serializer = FavoriteSerializer(recipe)
-            return Response(
-                serializer.data, status=status.HTTP_201_CREATED
-            )
-        raise ValidationError(
-            {'errors': 'The recipe is in the favorites already!'}
+        return self.add_or_remove(
+            request, pk, Favorite, FavoriteSerializer,
+            'The recipe is in the favorites already!'
         )
 
+    @action(
+        detail=False,
+        methods=['post', 'delete'],
+        url_path='favorite',
+        url_name='bulk-favorite',
+        permission_classes=[IsAuthenticated]
+    )
+    def bulk_favorite(self, request):
+        """Add or remove many favorite recipes at once"""
+        return self.bulk_add_or_remove(request, Favorite)
+
     @action(
         detail=True,
         methods=['get', 'delete'],
@@ -104,43 +292,103 @@ class RecipeViewSet(AtomicModelViewSetMixin,
     )
     def shopping_cart(self, request, pk):
         """Shopping cart of authenticated user"""
-        user = self.request.user
-        recipe = get_object_or_404(Recipe, pk=pk)
-        if request.method == 'DELETE':
-            ShoppingCart.objects.filter(user=user, recipe=recipe).delete()
-            return Response(status=status.HTTP_204_NO_CONTENT)
-        elif request.method == 'GET' and not ShoppingCart.objects.filter(
-            user=user, recipe=recipe
-        ).exists():
-            ShoppingCart.objects.create(user=user, recipe=recipe)
-            serializer = ShoppingCartSerializer(recipe)
-            return Response(
-                serializer.data, status=status.HTTP_201_CREATED
-            )
-        raise ValidationError(
-            {'errors': 'The recipe is in the shopping cart already!'}
+        return self.add_or_remove(
+            request, pk, ShoppingCart, ShoppingCartSerializer,
+            'The recipe is in the shopping cart already!'
         )
 
+    @action(
+        detail=False,
+        methods=['post', 'delete'],
+        url_path='shopping_cart',
+        url_name='bulk-shopping-cart',
+        permission_classes=[IsAuthenticated]
+    )
+    def bulk_shopping_cart(self, request):
+        """Add or remove many recipes of the shopping cart at once"""
+        return self.bulk_add_or_remove(request, ShoppingCart)
+
     @action(
         detail=False,
         methods=['get'],
         permission_classes=[IsAuthenticated]
     )
     def download_shopping_cart(self, request):
-        """Download shopping cart to pdf-file"""
-        current_user = self.request.user
-        ingredients = IngredientInRecipe.objects.filter(
-            recipe__recipe_cart__user=current_user
-        ).values_list(
-            'ingredient__name',
-            'amount',
-            'ingredient__measurement_unit__name')
-        ingredient_list = {}
-        for ingredient, amount, measurement_unit in ingredients:
-            if ingredient not in ingredient_list:
-                ingredient_list[ingredient] = {
-                    'amount': amount, 'measurement_unit': measurement_unit
-                }
-            else:
-                ingredient_list[ingredient]['amount'] += amount
-        return download_to_pdf(ingredient_list)
+        """Download shopping cart to pdf-file, ``?type=text`` or
+        ``?type=csv`` stream it as plain text or CSV instead.
+
+        A PDF that was not rendered before is queued as an export and
+        answered with ``202`` and the export to poll.
+        """
+        file_type = request.query_params.get('type', 'pdf')
+        if file_type != 'pdf' and file_type not in CONTENT_TYPES:
+            raise ValidationError(
+                {'errors': f'Unknown shopping list type {file_type}!'}
+            )
+        items = get_shopping_list(request.user)
+        if file_type != 'pdf':
+            return shopping_list_response(items, file_type)
+        name = get_cached_pdf(items)
+        if name is None:
+            # Rendered by the export worker, not in the request.
+            export = enqueue_export(request.user, items)
+            serializer = ShoppingListExportSerializer(
+                export, context=self.get_serializer_context()
+            )
+            return Response(
+                serializer.data, status=status.HTTP_202_ACCEPTED,
+                headers={'Location': reverse(
+                    'api:shopping_list_exports-detail', args=(export.id,)
+                )}
+            )
+        return pdf_response(default_storage.open(name))
+
+
+class ShoppingListExportViewSet(ThrottleCostMixin,
+                                mixins.CreateModelMixin,
+                                mixins.RetrieveModelMixin,
+                                viewsets.GenericViewSet):
+    """Shopping cart exports rendered in the background.
+
+    POST queues an export of the current cart, GET polls its status
+    and ``download`` serves the PDF once it is done.
+    """
+    serializer_class = ShoppingListExportSerializer
+    permission_classes = (IsAuthenticated,)
+    throttle_costs = {'create': (HEAVY, 10)}
+
+    def get_queryset(self):
+        return ShoppingListExport.objects.filter(user=self.request.user)
+
+    def create(self, request, *args, **kwargs):
+        export = enqueue_export(request.user)
+        serializer = self.get_serializer(export)
+        return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk):
+        """The PDF of a done export, an export whose PDF was purged is
+        queued again and answered like a new one.
+        """
+        export = self.get_object()
+        if export.status != ShoppingListExport.DONE:
+            raise ValidationError({'errors': 'The export is not ready yet!'})
+        try:
+            pdf = default_storage.open(get_export_name(export.digest))
+        except FileNotFoundError:
+            serializer = self.get_serializer(requeue_export(export))
+            return Response(
+                serializer.data, status=status.HTTP_202_ACCEPTED
+            )
+        return pdf_response(pdf)
+
+
+class MetricsView(APIView):
+    """Request latency histograms of this process for Prometheus"""
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request):
+        return HttpResponse(
+            registry.render() + throttle_metrics.render(),
+            content_type='text/plain; version=0.0.4'
+        )
@@ -25,13 +25,15 @@ INSTALLED_APPS = [
     'rest_framework.authtoken',
     'djoser',
     'users',
-    'api',
+    'api.apps.ApiConfig',
     'colorfield',
     'django_filters',
     'drf_yasg'
 ]
 
 MIDDLEWARE = [
+    'api.instrumentation.PerformanceMiddleware',
+    'api.routers.DatabaseRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -69,9 +71,42 @@ DATABASES = {
         'PASSWORD': os.environ.get('POSTGRES_PASSWORD'),
         'HOST': os.environ.get('POSTGRES_HOST'),
         'PORT': os.environ.get('POSTGRES_PORT'),
+        # Seconds a connection is kept open between requests.
+        'CONN_MAX_AGE': int(os.environ.get('POSTGRES_CONN_MAX_AGE', 60)),
+        # Seconds between pings of an open connection by
+        # api.routers.check_connections.
+        'CONN_HEALTH_CHECK_INTERVAL': int(
+            os.environ.get('POSTGRES_CONN_HEALTH_CHECK_INTERVAL', 30)
+        ),
     }
 }
 
+# Optional read replica, safe requests read from it.
+if os.environ.get('POSTGRES_REPLICA_HOST'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'HOST': os.environ.get('POSTGRES_REPLICA_HOST'),
+        'PORT': os.environ.get(
+            'POSTGRES_REPLICA_PORT', DATABASES['default']['PORT']
+        ),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+# Shared by the worker processes and the management commands, which
+# bump catalog versions, invalidate tokens and mark clients sticky
+# through it. Without CACHE_LOCATION every process has its own.
+if os.environ.get('CACHE_LOCATION'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+            'LOCATION': os.environ.get('CACHE_LOCATION'),
+        }
+    }
+
+DATABASE_ROUTERS = ['api.routers.ReplicaRouter']
+# Seconds a client reads from the primary after writing.
+REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS', 5))
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -92,11 +127,30 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticated',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_FILTER_BACKENDS': (
         'django_filters.rest_framework.DjangoFilterBackend',
     ),
+    'DEFAULT_THROTTLE_CLASSES': [
+        'api.throttling.UserCostThrottle',
+        'api.throttling.UserLightCostThrottle',
+        'api.throttling.IPCostThrottle',
+        'api.throttling.IPLightCostThrottle',
+    ],
+    # Cost units per period of the heavy and the light budgets, see
+    # throttle_costs of the views.
+    'DEFAULT_THROTTLE_RATES': {
+        'user_cost': os.environ.get('THROTTLE_USER_RATE', '120/min'),
+        'user_light_cost': os.environ.get(
+            'THROTTLE_USER_LIGHT_RATE', '300/min'
+        ),
+        'ip_cost': os.environ.get('THROTTLE_IP_RATE', '600/min'),
+        'ip_light_cost': os.environ.get('THROTTLE_IP_LIGHT_RATE', '600/min'),
+    },
+    # Proxies in front adding the client address to X-Forwarded-For.
+    # Without them the header comes from the client and is ignored.
+    'NUM_PROXIES': int(os.environ.get('NUM_PROXIES', 0)),
     'DEFAULT_PAGINATION_CLASS': 'api.pagination.CustomPageNumberPagination',
     'PAGE_SIZE': 6,
 }
@@ -119,6 +173,30 @@ DJOSER = {
     }
 }
 
+# Seconds a token is cached for, in the Django cache and in the
+# per-process LRU of AUTH_TOKEN_CACHE_SIZE tokens. Invalidation reaches
+# the other processes after AUTH_TOKEN_LOCAL_TTL at most when the cache
+# is shared, otherwise after AUTH_TOKEN_CACHE_TTL, which is then as
+# short.
+AUTH_TOKEN_LOCAL_TTL = 5
+AUTH_TOKEN_CACHE_TTL = (
+    60 * 5 if os.environ.get('CACHE_LOCATION') else AUTH_TOKEN_LOCAL_TTL
+)
+AUTH_TOKEN_CACHE_SIZE = 1024
+
+# Send the Server-Timing header to every client instead of staff users
+# only.
+SERVER_TIMING = DEBUG or (
+    os.environ.get('SERVER_TIMING', 'FALSE').upper() == 'TRUE'
+)
+
+THROTTLE_ENABLED = (
+    os.environ.get('THROTTLE_ENABLED', 'TRUE').upper() == 'TRUE'
+)
+# Where throttle counters live: 'local' to this process or the shared
+# 'cache'.
+THROTTLE_STORAGE = os.environ.get('THROTTLE_STORAGE', 'local')
+
 LANGUAGE_CODE = 'en-us'
 
 TIME_ZONE = 'UTC'
@@ -138,3 +216,35 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'backend_media')
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 IMPORT_EXPORT_USE_TRANSACTIONS = True
+
+INGREDIENT_SEARCH_INDEX = (
+    os.environ.get('INGREDIENT_SEARCH_INDEX', 'TRUE').upper() == 'TRUE'
+)
+INGREDIENT_SEARCH_LIMIT = 20
+
+# Seconds the table fingerprint of a catalog version is kept, and the
+# rendered catalogs. Bound how long a process serves a catalog changed
+# by another one when the cache is not shared.
+CATALOG_VERSION_TIMEOUT = 60
+CATALOG_CACHE_TIMEOUT = 60 * 10
+
+RECIPE_LIST_CACHE_TIMEOUT = 60 * 10
+# Build recipe list and detail responses with api.read_model instead
+# of the serializers.
+RECIPE_READ_MODEL = (
+    os.environ.get('RECIPE_READ_MODEL', 'FALSE').upper() == 'TRUE'
+)
+
+RECIPE_IMAGE_MAX_SIZE = 10 * 1024 * 1024
+IMAGE_RENDITION_WORKERS = 2
+
+# Threads for PDF rendering and image decoding per process.
+BLOCKING_WORKERS = int(os.environ.get('BLOCKING_WORKERS', 2))
+
+BULK_RECIPES_LIMIT = 100
+
+SHOPPING_LIST_EXPORT_PROCESSES = 2
+# Seconds before a running export is considered lost and queued again.
+SHOPPING_LIST_EXPORT_TIMEOUT = 60 * 10
+# Seconds exports and cached PDFs are kept.
+SHOPPING_LIST_EXPORT_TTL = 60 * 60 * 24
@@ -1,6 +1,8 @@
 from django.contrib import admin
 from django.contrib.auth.models import Group
 from django.contrib.auth import get_user_model
+from django.db.models import F
+from django.db.models.functions import Coalesce
 from api.models import (
     Ingredient, IngredientInRecipe, Recipe, Tag,
     Unit, Subscription, Favorite, ShoppingCart
@@ -21,11 +23,28 @@ admin.site.register(ShoppingCart)
 
 @admin.register(User)
 class UserAdmin(admin.ModelAdmin):
-    """Add filters list by email and username."""
-    list_display = ('username', 'email')
+    """Add filters list by email and username.
+    Add the number of the author's recipes and followers.
+    """
+    list_display = ('username', 'email', 'recipes_count', 'followers_count')
     list_filter = ('username', 'email')
     search_fields = ('username',)
 
+    def get_queryset(self, request):
+        # Users created before their stats row was backfilled have none.
+        return super().get_queryset(request).annotate(
+            stats_recipes_count=Coalesce(F('stats__recipes_count'), 0),
+            stats_followers_count=Coalesce(F('stats__followers_count'), 0),
+        )
+
+    def recipes_count(self, obj):
+        return obj.stats_recipes_count
+    recipes_count.admin_order_field = 'stats_recipes_count'
+
+    def followers_count(self, obj):
+        return obj.stats_followers_count
+    followers_count.admin_order_field = 'stats_followers_count'
+
 
 @admin.register(Recipe)
 class RecipeAdmin(admin.ModelAdmin):
@@ -34,9 +53,10 @@ class RecipeAdmin(admin.ModelAdmin):
     """
     list_display = ('name', 'author', 'total_in_favorites')
     list_filter = ('name', 'author', 'tags')
+    list_select_related = ('author',)
 
     def total_in_favorites(self, obj):
-        return obj.favorites_recipe.count()
+        return obj.favorites_count
 
 
 @admin.register(Ingredient)
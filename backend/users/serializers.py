@@ -20,13 +20,21 @@ class UserCustomSerializer(UserSerializer):
         )
 
     def get_is_subscribed(self, obj):
+        """Annotated by the views, otherwise looked up in the authors
+        the current user follows, loaded once per serializer tree.
+        """
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         request = self.context.get('request')
         if request is None or request.user.is_anonymous:
             return False
-        is_subscribed = Subscription.objects.filter(
-            user__id=request.user.id, author__id=obj.id
-        ).exists()
-        return is_subscribed
+        subscribed = self.context.get('subscribed_authors')
+        if subscribed is None:
+            subscribed = set(Subscription.objects.filter(
+                user=request.user
+            ).values_list('author_id', flat=True))
+            self.context['subscribed_authors'] = subscribed
+        return obj.id in subscribed
 
 
 class CreateUserCustomSerializer(UserCreateSerializer):
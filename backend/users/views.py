@@ -1,5 +1,7 @@
 from django.shortcuts import get_object_or_404
 from django.contrib.auth import get_user_model
+from django.db.models import BooleanField, Exists, F, OuterRef, Value
+from django.db.models.functions import Coalesce
 from djoser.views import UserViewSet
 from rest_framework import status
 from rest_framework.decorators import action
@@ -7,6 +9,7 @@ from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 
+from api.instrumentation import timed_serialization
 from api.models import Subscription
 from api.serializers import SubscribeSerializer
 
@@ -18,6 +21,13 @@ class UserCustomViewSet(UserViewSet):
     lookup_field = 'pk'
     permission_classes = (AllowAny,)
 
+    def get_queryset(self):
+        return super().get_queryset().annotate(
+            is_subscribed=Exists(Subscription.objects.filter(
+                user_id=self.request.user.id, author=OuterRef('pk')
+            ))
+        ).order_by('id')
+
     @action(
         methods=['get'],
         detail=False,
@@ -37,14 +47,22 @@ class UserCustomViewSet(UserViewSet):
         """Authenticated user's subscriptions to authors"""
         subscribes = User.objects.filter(
             subscribing__user=self.request.user
-        )
+        ).annotate(
+            recipes_count=Coalesce(F('stats__recipes_count'), 0),
+            is_subscribed=Value(True, output_field=BooleanField())
+        ).order_by('id')
+        page = self.paginate_queryset(subscribes)
+        if page is not None:
+            serializer = SubscribeSerializer(
+                page, context={'request': request}, many=True
+            )
+            with timed_serialization():
+                return self.get_paginated_response(serializer.data)
         serializer = SubscribeSerializer(
             subscribes, context={'request': request}, many=True
         )
-        page = self.paginate_queryset(serializer.data)
-        if page is not None:
-            return self.get_paginated_response(page)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        with timed_serialization():
+            return Response(serializer.data, status=status.HTTP_200_OK)
 
     @action(
         methods=['get', 'delete'],
@@ -69,6 +87,7 @@ class UserCustomViewSet(UserViewSet):
             user=user, author=author
         ).exists():
             Subscription.objects.create(user=user, author=author)
+            author.is_subscribed = True
             serializer = SubscribeSerializer(
                 author, context={'request': request}
             )